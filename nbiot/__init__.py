@@ -2,7 +2,19 @@ import logging
 from logging.config import DictConfigurator
 
 import click
-from .scan import connect, ping, stats, reboot
+from .scan import (
+    connect,
+    ping,
+    stats,
+    reboot,
+    attach_bench,
+    cells,
+    udp_bench,
+    echo_server,
+    survey,
+    geosurvey,
+    scenario,
+)
 import serial
 from .module import SaraN211Module
 
@@ -18,7 +30,9 @@ class AppContext:
 
 
 @click.group()
-@click.option("--port", "-p", help="Serial port to use")
+@click.option(
+    "--port", "-p", help="Serial port to use, or sim:// for a simulated module"
+)
 @click.option(
     "--roaming/--home-network",
     default=True,
@@ -103,3 +117,10 @@ cli.add_command(connect)
 cli.add_command(ping)
 cli.add_command(stats)
 cli.add_command(reboot)
+cli.add_command(attach_bench)
+cli.add_command(cells)
+cli.add_command(udp_bench)
+cli.add_command(echo_server)
+cli.add_command(survey)
+cli.add_command(geosurvey)
+cli.add_command(scenario)
@@ -0,0 +1,158 @@
+import time
+import logging
+from collections import namedtuple, deque
+from contextlib import contextmanager
+
+from .module import ATError, CMEError
+
+logger = logging.getLogger(__name__)
+
+OperationRecord = namedtuple(
+    "OperationRecord",
+    "operation destination ecl tx_power duration tx_time rx_time energy",
+)
+
+
+class AirtimeTotals:
+    """
+    Aggregated airtime and energy for one destination and ECL.
+    """
+
+    __slots__ = ("operations", "tx_time", "rx_time", "energy")
+
+    def __init__(self):
+        self.operations = 0
+        self.tx_time = 0
+        self.rx_time = 0
+        self.energy = 0.0
+
+    def add(self, record: OperationRecord):
+        self.operations += 1
+        self.tx_time += record.tx_time
+        self.rx_time += record.rx_time
+        self.energy += record.energy
+
+    def __repr__(self):
+        return (
+            f"AirtimeTotals(operations={self.operations}, tx_time={self.tx_time}, "
+            f"rx_time={self.rx_time}, energy={self.energy:.1f})"
+        )
+
+
+class AirtimeAccountant:
+    """
+    Attributes radio airtime and estimated energy to the operations on a module.
+
+    The cumulative TX and RX time counters from NUESTATS are sampled before and
+    after each operation. The energy is estimated in mJ from the airtime and
+    the typical current draw of the module while sending and receiving. The
+    power amplifier part of the TX current is scaled by the reported TX power.
+
+    Only the last max_records records are kept, the totals cover all of them.
+
+    Enable it by setting it on the module:
+
+        module.accounting = AirtimeAccountant(module)
+    """
+
+    VOLTAGE = 3.6  # V
+    TX_CURRENT = 220.0  # mA, at max TX power
+    RX_CURRENT = 46.0  # mA
+    MAX_TX_POWER = 23.0  # dBm
+    MAX_RECORDS = 1000
+
+    def __init__(
+        self,
+        module,
+        voltage=None,
+        tx_current=None,
+        rx_current=None,
+        max_records=MAX_RECORDS,
+    ):
+        self.module = module
+        self.voltage = voltage or self.VOLTAGE
+        self.tx_current = tx_current or self.TX_CURRENT
+        self.rx_current = rx_current or self.RX_CURRENT
+        self.records = deque(maxlen=max_records)
+        self.totals = dict()
+
+    def _sample(self, operation):
+        """
+        The radio tx and rx time counters, or None if they could not be read.
+        Accounting must never make the measured operation fail.
+        """
+        try:
+            self.module.update_radio_statistics()
+        except (ATError, CMEError, ValueError) as e:
+            logger.warning(f"Could not account airtime for {operation}: {e!r}")
+            return None
+        return self.module.radio_tx_time, self.module.radio_rx_time
+
+    def estimate_energy(self, tx_time, rx_time, tx_power=None):
+        """
+        Estimated energy in mJ for tx_time and rx_time in ms.
+        """
+        charge = tx_time * self.estimate_tx_current(tx_power)
+        charge += rx_time * self.rx_current
+        return self.voltage * charge / 1000
+
+    def estimate_tx_current(self, tx_power=None):
+        """
+        Current in mA while sending at tx_power in dBm. The RX current is drawn
+        at any power and the rest, drawn by the power amplifier, is scaled by
+        the output power in mW. Unknown power is taken as max power.
+        """
+        if tx_power is None:
+            return self.tx_current
+        ratio = 10 ** ((min(tx_power, self.MAX_TX_POWER) - self.MAX_TX_POWER) / 10)
+        return self.rx_current + (self.tx_current - self.rx_current) * ratio
+
+    @contextmanager
+    def measure(self, operation, destination=None):
+        """
+        Measure the airtime used by the operation run within the context.
+        """
+        before = self._sample(operation)
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start_time
+            if before is not None:
+                after = self._sample(operation)
+                if after is not None:
+                    self._record(operation, destination, duration, before, after)
+
+    def _record(self, operation, destination, duration, before, after):
+        if None in before or None in after:
+            logger.debug(f"No radio counters available for {operation}")
+            return
+        tx_time = after[0] - before[0]
+        rx_time = after[1] - before[1]
+        if tx_time < 0 or rx_time < 0:
+            # The counters are reset when the module reboots.
+            logger.debug(f"Radio counters were reset during {operation}")
+            return
+
+        tx_power = self.module.radio_tx_power
+        record = OperationRecord(
+            operation,
+            destination,
+            self.module.radio_ecl,
+            tx_power,
+            duration,
+            tx_time,
+            rx_time,
+            self.estimate_energy(tx_time, rx_time, tx_power),
+        )
+        logger.info(f"Airtime used: {record}")
+        self.records.append(record)
+        key = (destination, record.ecl)
+        if key not in self.totals:
+            self.totals[key] = AirtimeTotals()
+        self.totals[key].add(record)
+        return record
+
+    @property
+    def total_energy(self):
+        return sum(totals.energy for totals in self.totals.values())
@@ -0,0 +1,152 @@
+import time
+from collections import OrderedDict
+
+from .module import CellStats
+
+
+class RunningStats:
+    """
+    Running count, mean, min and max of a value without keeping the samples.
+    """
+
+    __slots__ = ("count", "mean", "min", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, value):
+        self.count += 1
+        if self.count == 1:
+            self.mean = self.min = self.max = value
+        else:
+            self.mean += (value - self.mean) / self.count
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+        self.last = value
+
+    def __repr__(self):
+        return (
+            f"RunningStats(count={self.count}, mean={self.mean}, min={self.min}, "
+            f"max={self.max}, last={self.last})"
+        )
+
+
+class CellEntry:
+    """
+    Everything observed about one cell.
+    """
+
+    __slots__ = ("earfcn", "pci", "first_seen", "last_seen", "rsrp", "rsrq", "snr")
+
+    def __init__(self, earfcn, pci, now):
+        self.earfcn = earfcn
+        self.pci = pci
+        self.first_seen = now
+        self.last_seen = now
+        self.rsrp = RunningStats()
+        self.rsrq = RunningStats()
+        self.snr = RunningStats()
+
+    @property
+    def key(self):
+        return self.earfcn, self.pci
+
+    def add(self, cell: CellStats, now):
+        self.last_seen = now
+        self.rsrp.add(cell.rsrp)
+        self.rsrq.add(cell.rsrq)
+        self.snr.add(cell.snr)
+
+    def __repr__(self):
+        return f"CellEntry(earfcn={self.earfcn}, pci={self.pci}, rsrp={self.rsrp.last})"
+
+
+class CellIndex:
+    """
+    In memory index of all observed cells keyed by (EARFCN, PCI).
+
+    Cells are kept in the order they were last seen so stale cells can be
+    evicted from the front. The best cell, by latest RSRP, is tracked on every
+    update so it can be looked up directly.
+    """
+
+    def __init__(self, max_age=60):
+        self.max_age = max_age
+        self.cells = OrderedDict()
+        self._best = None
+
+    def update(self, cell: CellStats, now=None):
+        now = now or time.time()
+        key = (cell.earfcn, cell.pci)
+        entry = self.cells.get(key)
+        if entry is None:
+            entry = CellEntry(cell.earfcn, cell.pci, now)
+            self.cells[key] = entry
+        else:
+            self.cells.move_to_end(key)
+        previous_rsrp = entry.rsrp.last
+        entry.add(cell, now)
+
+        best = self.best()
+        if key == self._best:
+            if entry.rsrp.last < previous_rsrp:
+                # The best cell got worse, another cell might be better now.
+                self._find_best()
+        elif best is None or entry.rsrp.last > best.rsrp.last:
+            self._best = key
+        return entry
+
+    def update_all(self, cells, now=None):
+        now = now or time.time()
+        for cell in cells:
+            self.update(cell, now)
+        self.evict(now)
+
+    def evict(self, now=None):
+        """
+        Remove cells that has not been seen within max_age seconds.
+        """
+        now = now or time.time()
+        evicted = list()
+        while self.cells:
+            key, entry = next(iter(self.cells.items()))
+            if now - entry.last_seen <= self.max_age:
+                break
+            del self.cells[key]
+            evicted.append(entry)
+        if self._best not in self.cells:
+            self._find_best()
+        return evicted
+
+    def _find_best(self):
+        self._best = None
+        best_rsrp = None
+        for key, entry in self.cells.items():
+            if best_rsrp is None or entry.rsrp.last > best_rsrp:
+                self._best = key
+                best_rsrp = entry.rsrp.last
+
+    def best(self):
+        """
+        The cell with the best latest RSRP, or None
+        """
+        if self._best is None:
+            return None
+        return self.cells[self._best]
+
+    def ranked(self, limit=None):
+        """
+        Cells ordered by latest RSRP, best first.
+        """
+        ranked = sorted(self.cells.values(), key=lambda e: e.rsrp.last, reverse=True)
+        return ranked[:limit] if limit else ranked
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, key):
+        return key in self.cells
@@ -0,0 +1,202 @@
+import time
+import logging
+import functools
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class CommandQueue:
+    """
+    Serializes transactions on a module so it can be shared between threads.
+
+    All transactions are run by one worker thread and the result is given to
+    the caller through a Future. Transactions with higher priority (lower
+    number) run first. Within a priority the calling threads are served round
+    robin so one busy thread can not starve the others.
+
+    Transactions started from within a running transaction are run directly,
+    so a transaction can be built from other transactions.
+    """
+
+    def __init__(self, name="nbiot-commands"):
+        self.name = name
+        self._condition = threading.Condition()
+        # priority -> OrderedDict(caller thread id -> deque of transactions)
+        self._levels = dict()
+        self._worker = None
+        self._worker_ident = None
+        self._closed = False
+        self._local = threading.local()
+
+    @property
+    def in_worker(self):
+        return threading.get_ident() == self._worker_ident
+
+    @contextmanager
+    def priority(self, priority):
+        """
+        Run all transactions of the current thread with priority within the
+        context.
+        """
+        previous = getattr(self._local, "priority", None)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def _priority(self, priority):
+        if priority is not None:
+            return priority
+        current = getattr(self._local, "priority", None)
+        return PRIORITY_NORMAL if current is None else current
+
+    def submit(self, fn, *args, priority=None, **kwargs):
+        """
+        Queue fn to be run by the worker.
+        :return: Future with the result of fn
+        """
+        future = Future()
+        caller = threading.get_ident()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Command queue is closed")
+            level = self._levels.setdefault(self._priority(priority), OrderedDict())
+            level.setdefault(caller, deque()).append((future, fn, args, kwargs))
+            self._start_worker()
+            self._condition.notify()
+        return future
+
+    def run(self, fn, *args, priority=None, **kwargs):
+        """
+        Run fn as a transaction and wait for the result.
+        """
+        if self.in_worker:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, priority=priority, **kwargs).result()
+
+    def _start_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._work, name=self.name, daemon=True
+            )
+            self._worker.start()
+
+    def _next(self):
+        """
+        Take the next transaction. Must be called holding the condition.
+        """
+        for priority in sorted(self._levels):
+            level = self._levels[priority]
+            if not level:
+                continue
+            caller, transactions = level.popitem(last=False)
+            transaction = transactions.popleft()
+            if transactions:
+                # Put the caller last so the other callers get their turn.
+                level[caller] = transactions
+            return transaction
+        return None
+
+    def _work(self):
+        self._worker_ident = threading.get_ident()
+        while True:
+            with self._condition:
+                transaction = self._next()
+                while transaction is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                    transaction = self._next()
+
+            future, fn, args, kwargs = transaction
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """
+        Run the transactions already queued and stop the worker.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker is not None and not self.in_worker:
+            self._worker.join()
+
+
+class QueryCache:
+    """
+    Short time cache for read-only queries.
+
+    All commands run one at a time on the command queue, so identical queries
+    queued by several threads are run once and the others are served from the
+    cache for ttl seconds, unless it is invalidated. A query running while the
+    cache is invalidated is not cached since its result may be stale.
+    """
+
+    def __init__(self, ttl=1.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache = dict()
+        self._generation = 0
+        self.executed = 0
+        self.cached = 0
+
+    def get(self, key, fn):
+        """
+        Result of fn for key, from the cache if it is recent enough.
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self.cached += 1
+                return list(cached[1])
+            generation = self._generation
+            self.executed += 1
+
+        result = fn()
+
+        with self._lock:
+            if generation == self._generation:
+                self._cache[key] = (time.monotonic() + self.ttl, result)
+        return list(result)
+
+    def invalidate(self, commands=None):
+        """
+        Drop cached results for keys starting with one of commands, or all.
+        """
+        with self._lock:
+            self._generation += 1
+            if commands is None:
+                self._cache.clear()
+            else:
+                for key in list(self._cache):
+                    if key[0] in commands:
+                        del self._cache[key]
+
+
+def serialized(method):
+    """
+    Decorator that makes a module method run as one transaction on the
+    command queue of the module.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._commands.run(method, self, *args, **kwargs)
+
+    return wrapper
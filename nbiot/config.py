@@ -0,0 +1,148 @@
+import logging
+
+from . import parsers
+
+logger = logging.getLogger(__name__)
+
+
+class ModemConfig:
+    """
+    Desired settings of a module. Applying it reads the current settings from
+    the module and only sends the commands for settings that differ. Some
+    commands, like AT+CGDCONT and AT+CFUN, can make the module detach and
+    reattach so we don't want to send them if not needed.
+
+    A setting that is None is left as it is on the module.
+    """
+
+    def __init__(
+        self,
+        signaling_connection_urc=True,
+        network_registration_urc=True,
+        radio_functions=True,
+        psm=None,
+        apn=None,
+        pdp_type="IP",
+        cid=1,
+        autoconnect=None,
+    ):
+        self.signaling_connection_urc = signaling_connection_urc
+        self.network_registration_urc = network_registration_urc
+        self.radio_functions = radio_functions
+        self.psm = psm
+        self.apn = apn
+        self.pdp_type = pdp_type
+        self.cid = cid
+        self.autoconnect = autoconnect
+
+    @staticmethod
+    def _first_value(module, at_command, urc_prefix: bytes):
+        response = module._at_action(at_command, capture_urc=True)
+        line = parsers.search_urc_result(urc_prefix, response)
+        if line is None:
+            return None
+        return parsers.fields(line)
+
+    def read(self, module):
+        """
+        Read the current settings from the module as one transaction.
+        :return: dict with the same keys as the settings
+        """
+        return module.run_transaction(self._read, module)
+
+    def _read(self, module):
+        current = dict()
+        cscon = self._first_value(module, "AT+CSCON?", b"+CSCON:")
+        current["signaling_connection_urc"] = bool(cscon and cscon[0] == b"1")
+        cereg = self._first_value(module, "AT+CEREG?", b"+CEREG:")
+        current["network_registration_urc"] = bool(cereg and cereg[0] == b"1")
+        cfun = self._first_value(module, "AT+CFUN?", b"+CFUN:")
+        current["radio_functions"] = bool(cfun and cfun[0] == b"1")
+
+        cpsms = self._first_value(module, "AT+CPSMS?", b"+CPSMS:")
+        npsmr = self._first_value(module, "AT+NPSMR?", b"+NPSMR:")
+        if cpsms and npsmr and cpsms[0] == npsmr[0]:
+            current["psm"] = cpsms[0] == b"1"
+        else:
+            # Partly enabled, so neither enabled nor disabled.
+            current["psm"] = None
+
+        current["apn"] = None
+        current["pdp_type"] = None
+        for line in module._at_action("AT+CGDCONT?", capture_urc=True):
+            if not line.startswith(b"+CGDCONT:"):
+                continue
+            values = parsers.fields(line)
+            if int(values[0]) == self.cid:
+                current["pdp_type"] = values[1].decode()
+                current["apn"] = values[2].decode()
+
+        current["autoconnect"] = None
+        for line in module._at_action("AT+NCONFIG?", capture_urc=True):
+            values = parsers.fields(line)
+            if line.startswith(b"+NCONFIG:") and values[0] == b"AUTOCONNECT":
+                current["autoconnect"] = values[1] == b"TRUE"
+
+        logger.debug(f"Current module settings: {current}")
+        return current
+
+    def changes(self, current):
+        """
+        The names of the settings that differ from current.
+        """
+        changed = list()
+        if self.apn is not None and (
+            current["apn"] != self.apn or current["pdp_type"] != self.pdp_type
+        ):
+            changed.append("apn")
+        for name in (
+            "signaling_connection_urc",
+            "network_registration_urc",
+            "radio_functions",
+            "psm",
+            "autoconnect",
+        ):
+            desired = getattr(self, name)
+            if desired is not None and current[name] != desired:
+                changed.append(name)
+        return changed
+
+    def apply(self, module):
+        """
+        Send the commands needed to get the module to the desired settings.
+        :return: The names of the settings that were changed.
+        """
+        return module.run_transaction(self._apply, module)
+
+    def _apply(self, module):
+        changed = self.changes(self._read(module))
+        if "apn" in changed:
+            module.set_pdp_context(self.apn, pdp_type=self.pdp_type, cid=self.cid)
+        if "signaling_connection_urc" in changed:
+            if self.signaling_connection_urc:
+                module.enable_signaling_connection_urc()
+            else:
+                module.disable_signaling_connection_urc()
+        if "network_registration_urc" in changed:
+            if self.network_registration_urc:
+                module.enable_network_registration()
+            else:
+                module.disable_network_registration()
+        if "radio_functions" in changed:
+            if self.radio_functions:
+                module.enable_radio_functions()
+            else:
+                module.disable_radio_functions()
+        if "psm" in changed:
+            if self.psm:
+                module.enable_psm_mode()
+            else:
+                module.disable_psm_mode()
+        if "autoconnect" in changed:
+            if self.autoconnect:
+                module.enable_autoconnect()
+            else:
+                module.disable_autoconnect()
+
+        logger.info(f"Applied module settings, changed: {changed or 'nothing'}")
+        return changed
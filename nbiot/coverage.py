@@ -0,0 +1,165 @@
+import math
+import time
+import json
+import logging
+from collections import deque, namedtuple
+
+from .cells import RunningStats
+
+logger = logging.getLogger(__name__)
+
+RadioSample = namedtuple("RadioSample", "timestamp rsrq ecl")
+
+
+class TileStats:
+    """
+    Aggregated radio samples in one tile.
+    """
+
+    __slots__ = ("count", "rsrq", "ecl_counts")
+
+    def __init__(self):
+        self.count = 0
+        self.rsrq = RunningStats()
+        self.ecl_counts = [0, 0, 0]
+
+    def add(self, rsrq, ecl):
+        self.count += 1
+        if rsrq is not None:
+            self.rsrq.add(rsrq)
+        if ecl is not None and 0 <= ecl < len(self.ecl_counts):
+            self.ecl_counts[ecl] += 1
+
+
+class TileIndex:
+    """
+    Spatial grid of fixed size square tiles with aggregated radio statistics.
+
+    Positions are projected to meters using the latitude of the first sample as
+    reference, so all tiles have the same size in a survey area. Only the
+    aggregates are kept so memory depends on the area covered, not the number
+    of samples.
+    """
+
+    METERS_PER_DEGREE = 111320
+
+    def __init__(self, tile_size=100):
+        self.tile_size = tile_size
+        self.reference_latitude = None
+        self.tiles = dict()
+
+    def _scale(self):
+        lat_scale = self.tile_size / self.METERS_PER_DEGREE
+        lon_scale = lat_scale / math.cos(math.radians(self.reference_latitude))
+        return lat_scale, lon_scale
+
+    def key(self, latitude, longitude):
+        if self.reference_latitude is None:
+            self.reference_latitude = latitude
+        lat_scale, lon_scale = self._scale()
+        return math.floor(longitude / lon_scale), math.floor(latitude / lat_scale)
+
+    def add(self, latitude, longitude, rsrq, ecl):
+        key = self.key(latitude, longitude)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = TileStats()
+            self.tiles[key] = tile
+        tile.add(rsrq, ecl)
+        return tile
+
+    def bounds(self, key):
+        """
+        (min longitude, min latitude, max longitude, max latitude) of a tile
+        """
+        lat_scale, lon_scale = self._scale()
+        x, y = key
+        return x * lon_scale, y * lat_scale, (x + 1) * lon_scale, (y + 1) * lat_scale
+
+    def to_geojson(self):
+        features = list()
+        for key, tile in self.tiles.items():
+            west, south, east, north = self.bounds(key)
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [
+                            [
+                                [west, south],
+                                [east, south],
+                                [east, north],
+                                [west, north],
+                                [west, south],
+                            ]
+                        ],
+                    },
+                    "properties": {
+                        "samples": tile.count,
+                        "rsrq_mean_db": tile.rsrq.mean,
+                        "rsrq_min_db": tile.rsrq.min,
+                        "rsrq_max_db": tile.rsrq.max,
+                        "ecl_0": tile.ecl_counts[0],
+                        "ecl_1": tile.ecl_counts[1],
+                        "ecl_2": tile.ecl_counts[2],
+                    },
+                }
+            )
+        return {"type": "FeatureCollection", "features": features}
+
+    def write_geojson(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_geojson(), f)
+
+    def __len__(self):
+        return len(self.tiles)
+
+
+class GeoSurvey:
+    """
+    Samples radio statistics from the module and joins each sample to the GPS
+    fix nearest in time. Samples wait join_window seconds before they are
+    joined so that fixes received just after the sample are considered too.
+    """
+
+    def __init__(self, module, gps, index: TileIndex, join_window=2.0, max_fix_age=5.0):
+        self.module = module
+        self.gps = gps
+        self.index = index
+        self.join_window = join_window
+        self.max_fix_age = max_fix_age
+        self.pending = deque(maxlen=1000)
+        self.joined = 0
+        self.unjoined = 0
+
+    @property
+    def last_rsrq(self):
+        """
+        RSRQ in dB of the last sample. The module reports tenths of a dB.
+        """
+        rsrq = self.module.radio_rsrq
+        return None if rsrq is None else rsrq / 10
+
+    def sample(self):
+        self.module.update_radio_statistics()
+        self.pending.append(
+            RadioSample(time.time(), self.last_rsrq, self.module.radio_ecl)
+        )
+
+    def process(self, flush=False):
+        """
+        Join the pending samples that are old enough and add them to the index.
+        """
+        now = time.time()
+        while self.pending and (
+            flush or self.pending[0].timestamp + self.join_window <= now
+        ):
+            sample = self.pending.popleft()
+            fix = self.gps.nearest(sample.timestamp, self.max_fix_age)
+            if fix is None:
+                self.unjoined += 1
+                logger.debug(f"No GPS fix for sample {sample}")
+                continue
+            self.index.add(fix.latitude, fix.longitude, sample.rsrq, sample.ecl)
+            self.joined += 1
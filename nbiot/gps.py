@@ -0,0 +1,132 @@
+import time
+import logging
+import threading
+from collections import deque, namedtuple
+from functools import reduce
+
+import serial
+
+logger = logging.getLogger(__name__)
+
+Fix = namedtuple("Fix", "timestamp latitude longitude")
+
+
+def nmea_checksum_ok(sentence: bytes):
+    """
+    Verify the checksum of a sentence like b"$GPGGA,...*47"
+    """
+    star = sentence.rfind(b"*")
+    if not sentence.startswith(b"$") or star == -1:
+        return False
+    checksum = reduce(lambda a, b: a ^ b, sentence[1:star], 0)
+    try:
+        return checksum == int(sentence[star + 1 : star + 3], 16)
+    except ValueError:
+        return False
+
+
+def _coordinate(value: bytes, hemisphere: bytes):
+    """
+    NMEA coordinates are (d)ddmm.mmmm
+    """
+    dot = value.find(b".")
+    degrees = int(value[: dot - 2])
+    minutes = float(value[dot - 2 :])
+    coordinate = degrees + minutes / 60
+    if hemisphere in (b"S", b"W"):
+        coordinate = -coordinate
+    return coordinate
+
+
+def parse_nmea(sentence: bytes):
+    """
+    Parse the position from a GGA or RMC sentence from any talker.
+    :return: (latitude, longitude) or None if there is no valid fix
+    """
+    sentence = sentence.strip()
+    if not nmea_checksum_ok(sentence):
+        return None
+    fields = sentence[: sentence.rfind(b"*")].split(b",")
+    sentence_type = fields[0][3:]
+    try:
+        if sentence_type == b"GGA" and fields[6] not in (b"", b"0"):
+            return (
+                _coordinate(fields[2], fields[3]),
+                _coordinate(fields[4], fields[5]),
+            )
+        elif sentence_type == b"RMC" and fields[2] == b"A":
+            return (
+                _coordinate(fields[3], fields[4]),
+                _coordinate(fields[5], fields[6]),
+            )
+    except (IndexError, ValueError):
+        logger.debug(f"Invalid NMEA sentence: {sentence}")
+    return None
+
+
+class GPSReader:
+    """
+    Reads NMEA from a GPS receiver on a serial port in a background thread.
+    The fixes are timestamped with the local clock when they are received so
+    they can be joined with radio samples. Only the latest max_fixes are kept.
+    """
+
+    BAUDRATE = 9600
+
+    def __init__(self, serial_port: str, baudrate=None, max_fixes=3600):
+        self._serial_port = serial_port
+        self._serial = serial.Serial(
+            serial_port, baudrate=baudrate or self.BAUDRATE, timeout=1
+        )
+        self.fixes = deque(maxlen=max_fixes)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._read, name="nbiot-gps", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self._serial.close()
+
+    def _read(self):
+        while self._running:
+            line = self._serial.read_until()
+            if not line:
+                continue
+            position = parse_nmea(line)
+            if position:
+                with self._lock:
+                    self.fixes.append(Fix(time.time(), *position))
+
+    def add_fix(self, fix: Fix):
+        with self._lock:
+            self.fixes.append(fix)
+
+    def nearest(self, timestamp, max_age=5.0):
+        """
+        The fix closest in time to timestamp, or None if there is no fix
+        within max_age seconds.
+        """
+        best = None
+        with self._lock:
+            # Fixes are in time order so we can stop when they get too old.
+            for fix in reversed(self.fixes):
+                difference = abs(fix.timestamp - timestamp)
+                if fix.timestamp < timestamp - max_age:
+                    break
+                if difference <= max_age and (
+                    best is None or difference < abs(best.timestamp - timestamp)
+                ):
+                    best = fix
+        return best
+
+    def __repr__(self):
+        return f'GPSReader(serial_port="{self._serial_port}")'
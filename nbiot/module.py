@@ -1,14 +1,21 @@
 import time
 import serial
 import binascii
-from collections import namedtuple
+from contextlib import contextmanager
 import logging
 
-from .socket import UDPSocket
+from . import parsers
+from .commands import CommandQueue, QueryCache, serialized
+from .parsers import Stats, CellStats
+from .socket import UDPSocket, SocketPool
+from .state import ModuleState, StateAttribute, StateWatcher
+from .timeline import AttachTimeline
 
 logger = logging.getLogger(__name__)
 
-Stats = namedtuple("Stats", "type name value")
+# Makes sim:// open the simulated module in nbiot.protocol_sim.
+if "nbiot" not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.append("nbiot")
 
 
 class CMEError(Exception):
@@ -27,82 +34,249 @@ class ConnectionTimeoutError(ATTimeoutError):
     """Module did not connect within the specified time"""
 
 
+class RegistrationDeniedError(ATError):
+    """The network denied the registration"""
+
+
 class PingError(Exception):
     """Something went wrong during ping."""
 
 
+def _until(deadline, timeout):
+    """
+    The timeout, shortened to what is left until deadline if there is one.
+    """
+    if deadline is None:
+        return timeout
+    return max(0, min(timeout, deadline - time.time()))
+
+
 class SaraN211Module:
     """
     Represents a Ublox SARA N211 module.
     Power-optimized NB-IoT (LTE Cat NB1) module.
+
+    The module can be shared between threads. All AT transactions are run one
+    at a time from an internal command queue.
     """
 
     BAUDRATE = 9600
     RTSCTS = False
 
     AT_ENABLE_NETWORK_REGISTRATION = "AT+CEREG=1"
+    AT_DISABLE_NETWORK_REGISTRATION = "AT+CEREG=0"
     AT_ENABLE_SIGNALING_CONNECTION_URC = "AT+CSCON=1"
+    AT_DISABLE_SIGNALING_CONNECTION_URC = "AT+CSCON=0"
     AT_ENABLE_POWER_SAVING_MODE = "AT+CPSMS=1"
     AT_DISABLE_POWER_SAVING_MODE = "AT+CPSMS=0"
     AT_ENABLE_POWER_SAVING_MODE_URC = "AT+NPSMR=1"
     AT_DISABLE_POWER_SAVING_MODE_URC = "AT+NPSMR=0"
     AT_ENABLE_ALL_RADIO_FUNCTIONS = "AT+CFUN=1"
+    AT_DISABLE_ALL_RADIO_FUNCTIONS = "AT+CFUN=0"
     AT_REBOOT = "AT+NRB"
     AT_CLOSE_SOCKET = "AT+NSOCL"
+    AT_DEREGISTER = "AT+COPS=2"
+
+    REGISTRATION_DENIED = 3
 
     AT_GET_IP = "AT+CGPADDR"
 
     AT_SEND_TO = "AT+NSOST"
     AT_CHECK_CONNECTION_STATUS = "AT+CSCON?"
     AT_RADIO_INFORMATION = 'AT+NUESTATS="RADIO"'
+    AT_CELL_INFORMATION = 'AT+NUESTATS="CELL"'
+
+    # NUESTATS "RADIO" name -> (attribute, divisor)
+    RADIO_STATS = {
+        b"Signal power": ("radio_signal_power", 10),
+        b"Total power": ("radio_total_power", 10),
+        b"TX power": ("radio_tx_power", 10),
+        b"TX time": ("radio_tx_time", None),
+        b"RX time": ("radio_rx_time", None),
+        b"Cell ID": ("radio_cell_id", None),
+        b"ECL": ("radio_ecl", None),
+        b"SNR": ("radio_snr", None),
+        b"EARFCN": ("radio_earfcn", None),
+        b"PCI": ("radio_pci", None),
+        b"RSRQ": ("radio_rsrq", None),
+    }
+
+    # Queries without side effects on the module. The result is cached for
+    # QUERY_CACHE_TTL seconds.
+    READ_ONLY_QUERIES = {
+        AT_GET_IP,
+        AT_CHECK_CONNECTION_STATUS,
+        AT_RADIO_INFORMATION,
+        AT_CELL_INFORMATION,
+        "AT+CEREG?",
+        "AT+CGDCONT?",
+        "AT+CFUN?",
+        "AT+CPSMS?",
+        "AT+NPSMR?",
+        "AT+NCONFIG?",
+        "AT+CGSN=1",
+        "AT+CIMI",
+        "AT+CCID",
+    }
+    QUERY_CACHE_TTL = 1.0
+
+    # Cached queries that are outdated when a URC is received.
+    URC_INVALIDATES = {
+        b"CSCON": {
+            AT_CHECK_CONNECTION_STATUS,
+            AT_RADIO_INFORMATION,
+            AT_CELL_INFORMATION,
+        },
+        b"CEREG": {
+            "AT+CEREG?",
+            AT_GET_IP,
+            AT_RADIO_INFORMATION,
+            AT_CELL_INFORMATION,
+        },
+        b"NPSMR": {"AT+NPSMR?", AT_RADIO_INFORMATION},
+        b"CGPADDR": {AT_GET_IP},
+    }
 
     REBOOT_TIME = 0
+    REBOOT_TIMEOUT = 30
+    # The module prints a banner when it has booted after a reboot. If it
+    # doesn't show up within BOOT_BANNER_TIMEOUT we start probing anyway.
+    BOOT_BANNER = b"u-blox"
+    BOOT_BANNER_TIMEOUT = 5
+    # Serial read timeout while waiting for the module to become ready.
+    PROBE_READ_TIMEOUT = 0.5
 
     SUPPORTED_SOCKET_TYPES = ["UDP"]
+    MAX_SOCKETS = 7
+
+    # All states live in self.state but are exposed on the module, ex. module.ip
+    registration_status = StateAttribute("registration_status")
+    connected = StateAttribute("connected")
+    psm_active = StateAttribute("psm_active")
+    ip = StateAttribute("ip")
+    imei = StateAttribute("imei")
+    imsi = StateAttribute("imsi")
+    iccid = StateAttribute("iccid")
+    apn = StateAttribute("apn")
+    sockets = StateAttribute("sockets")
+    radio_signal_power = StateAttribute("radio_signal_power")
+    radio_total_power = StateAttribute("radio_total_power")
+    radio_tx_power = StateAttribute("radio_tx_power")
+    radio_tx_time = StateAttribute("radio_tx_time")
+    radio_rx_time = StateAttribute("radio_rx_time")
+    radio_cell_id = StateAttribute("radio_cell_id")
+    radio_ecl = StateAttribute("radio_ecl")
+    radio_snr = StateAttribute("radio_snr")
+    radio_earfcn = StateAttribute("radio_earfcn")
+    radio_pci = StateAttribute("radio_pci")
+    radio_rsrq = StateAttribute("radio_rsrq")
+    radio_rsrp = StateAttribute("radio_rsrp")
 
     def __init__(self, serial_port: str, roaming=False, echo=False):
         self._serial_port = serial_port
-        self._serial = serial.Serial(
-            self._serial_port, baudrate=self.BAUDRATE, rtscts=self.RTSCTS, timeout=5
+        self._serial = serial.serial_for_url(
+            self._serial_port,
+            baudrate=self.BAUDRATE,
+            rtscts=self.RTSCTS,
+            timeout=5,
+            do_not_open=serial_port is None,
         )
         self.echo = echo
         self.roaming = roaming
-        self.ip = None
-        self.connected = False
-        self.sockets = {}
+        self._commands = CommandQueue()
+        self._queries = QueryCache(ttl=self.QUERY_CACHE_TTL)
+        self.state = ModuleState()
         self.available_messages = list()
-        self.imei = None
-        self.imsi = None
-        self.iccid = None
-        self.apn = None
-        # TODO: make a class containing all states
-        self.registration_status = 0
-        self.radio_signal_power = None
-        self.radio_total_power = None
-        self.radio_tx_power = None
-        self.radio_tx_time = None
-        self.radio_rx_time = None
-        self.radio_cell_id = None
-        self.radio_ecl = None
-        self.radio_snr = None
-        self.radio_earfcn = None
-        self.radio_pci = None
-        self.radio_rsrq = None
-        self.radio_rsrp = None
-
-    def reboot(self):
-        """
-        Rebooting the module. Will run the AT_REBOOT command and also flush the
-        serial port to get rid of trash input from when the module restarted.
+        # Seconds it took for the module to be ready after the last reboot.
+        self.boot_time = None
+        # Timeline of state transitions during the last connect.
+        self.timeline = None
+        # Set to an AirtimeAccountant to account airtime per operation.
+        self.accounting = None
+        self.socket_pool = SocketPool(self)
+
+    @serialized
+    def reboot(self, timeout=None):
         """
+        Rebooting the module. Will run the AT_REBOOT command and wait for the
+        boot banner. Then the module is probed with AT until it answers so we
+        return as soon as the module is ready. timeout is the time we probe
+        the module for. Returns the measured boot time.
+        """
+        timeout = timeout or self.REBOOT_TIMEOUT
         logger.info("Rebooting module")
-        self._at_action(self.AT_REBOOT)
+        start_time = time.time()
+        self._write(self.AT_REBOOT)
         logger.info("waiting for module to boot up")
+        self._await_boot_banner(self.BOOT_BANNER_TIMEOUT)
         time.sleep(self.REBOOT_TIME)
-        self._serial.flushInput()  # Flush the serial ports to get rid of crap.
-        self._serial.flushOutput()
-        logger.info("Module rebooted")
         self._reset_after_reboot()
+        self._await_ready(timeout)
+        self.boot_time = time.time() - start_time
+        logger.info(f"Module rebooted in {self.boot_time:.2f} s")
+        return self.boot_time
+
+    def _await_boot_banner(self, timeout):
+        """
+        Read the output of the rebooting module until the boot banner. Anything
+        before it is trash from the restart.
+        """
+        start_time = time.time()
+        with self._read_timeout(self.PROBE_READ_TIMEOUT):
+            while time.time() - start_time < timeout:
+                line = self._serial.read_until()
+                if self.BOOT_BANNER in line:
+                    logger.debug(f"Received boot banner: {line}")
+                    return
+                elif line:
+                    logger.debug(f"Discarded during boot: {line}")
+        logger.warning("No boot banner received, probing module anyway")
+
+    def _await_ready(self, timeout):
+        """
+        Probe the module with AT until it answers OK.
+        """
+        start_time = time.time()
+        with self._read_timeout(self.PROBE_READ_TIMEOUT):
+            while True:
+                try:
+                    self._at_action("AT", timeout=1)
+                    return
+                except (ATError, CMEError, ValueError) as e:
+                    logger.debug(f"Module not ready: {e!r}")
+                if time.time() - start_time > timeout:
+                    raise ATTimeoutError("Module did not answer AT")
+                # Drop any late answer to the failed probe, but keep URCs.
+                self._discard_input()
+                time.sleep(0.1)
+
+    def _discard_input(self):
+        """
+        Throw away what is left in the input buffer, except URCs which are
+        processed as usual.
+        :return: True if the boot banner was thrown away.
+        """
+        banner = False
+        while self._serial.in_waiting:
+            line = self._remove_line_ending(self._serial.read_until())
+            if line.startswith(b"+") and parsers.urc_id(line) != b"CME ERROR":
+                self._process_urc(line)
+            elif line:
+                logger.debug(f"Discarded: {line}")
+                banner = banner or self.BOOT_BANNER in line
+        return banner
+
+    @contextmanager
+    def _read_timeout(self, timeout):
+        """
+        Use a different read timeout on the serial port within the context.
+        """
+        previous = self._serial.timeout
+        self._serial.timeout = timeout
+        try:
+            yield
+        finally:
+            self._serial.timeout = previous
 
     def _reset_after_reboot(self):
         """
@@ -110,11 +284,77 @@ class SaraN211Module:
         """
         self.registration_status = 0
         self.connected = False
+        self.psm_active = False
         self.ip = None
-        self.connected = False
         self.sockets = {}
         self.available_messages = list()
 
+    @serialized
+    def resynchronize(self, timeout=10):
+        """
+        Get the serial line back in sync after an error by throwing away
+        whatever is left of the last answer and probing the module with AT.
+        URCs in the input are still processed.
+        :return: True if the boot banner was thrown away, so the module has
+            restarted by itself.
+        """
+        logger.info("Resynchronizing serial line")
+        restarted = self._discard_input()
+        self._await_ready(timeout)
+        return restarted
+
+    @serialized
+    def read_radio_functionality(self):
+        """
+        Read the functionality level of the module, 1 when all radio functions
+        are enabled and 0 when the radio is off.
+        """
+        response = self._at_action("AT+CFUN?", capture_urc=True)
+        line = parsers.search_urc_result(b"+CFUN:", response)
+        if line is None:
+            return None
+        return int(parsers.fields(line)[0])
+
+    def run_transaction(self, fn, *args, **kwargs):
+        """
+        Run fn as one transaction on the command queue and wait for the result.
+        """
+        return self._commands.run(fn, *args, **kwargs)
+
+    def submit(self, fn, *args, priority=None, **kwargs):
+        """
+        Run fn, ex. module.ping, on the command queue without waiting for it.
+        :return: Future with the result
+        """
+        return self._commands.submit(fn, *args, priority=priority, **kwargs)
+
+    def priority(self, priority):
+        """
+        Context manager to run the module calls of the current thread with a
+        priority, ex. PRIORITY_HIGH for keep-alives.
+        """
+        return self._commands.priority(priority)
+
+    def close(self):
+        """
+        Finish queued transactions and close the serial port.
+        """
+        self._commands.close()
+        self._serial.close()
+
+    def snapshot(self):
+        """
+        Returns an immutable snapshot of the current module state.
+        """
+        return self.state.snapshot()
+
+    def watch(self):
+        """
+        Returns a StateWatcher that reports state changes since it last polled.
+        """
+        return StateWatcher(self.state)
+
+    @serialized
     def setup(self):
         """
         Running all commands to get the module up an working
@@ -127,6 +367,7 @@ class SaraN211Module:
         self.enable_radio_functions()
         logger.info(f"Finished initiation process")
 
+    @serialized
     def read_module_status(self):
 
         self._at_action("AT+CGPADDR")
@@ -152,6 +393,7 @@ class SaraN211Module:
         self._at_action('AT+NCONFIG="AUTOCONNECT","FALSE"')
         logger.info("Disabled AutoConnect")
 
+    @serialized
     def enable_psm_mode(self):
         """
         Enable Power Save Mode
@@ -160,6 +402,7 @@ class SaraN211Module:
         self._at_action(self.AT_ENABLE_POWER_SAVING_MODE_URC)
         logger.info("Enabled Power Save Mode")
 
+    @serialized
     def disable_psm_mode(self):
         """
         Enable Power Save Mode
@@ -175,6 +418,13 @@ class SaraN211Module:
         self._at_action(self.AT_ENABLE_SIGNALING_CONNECTION_URC)
         logger.info("Signaling Connection URC enabled")
 
+    def disable_signaling_connection_urc(self):
+        """
+        Disable Signaling Connection URC
+        """
+        self._at_action(self.AT_DISABLE_SIGNALING_CONNECTION_URC)
+        logger.info("Signaling Connection URC disabled")
+
     def enable_network_registration(self):
         """
         Enable Network registration
@@ -182,6 +432,13 @@ class SaraN211Module:
         self._at_action(self.AT_ENABLE_NETWORK_REGISTRATION)
         logger.info("Network registration enabled")
 
+    def disable_network_registration(self):
+        """
+        Disable Network registration URC
+        """
+        self._at_action(self.AT_DISABLE_NETWORK_REGISTRATION)
+        logger.info("Network registration disabled")
+
     def enable_radio_functions(self):
         """
         Enable all radio functions.
@@ -189,12 +446,50 @@ class SaraN211Module:
         self._at_action(self.AT_ENABLE_ALL_RADIO_FUNCTIONS)
         logger.info("All radio functions enabled")
 
-    def connect(self, operator: int, roaming=False):
+    def disable_radio_functions(self):
+        """
+        Disable all radio functions. The module detaches from the network.
+        """
+        self._at_action(self.AT_DISABLE_ALL_RADIO_FUNCTIONS)
+        logger.info("All radio functions disabled")
+
+    @serialized
+    def connect(
+        self,
+        operator: int,
+        roaming=False,
+        cops_timeout=300,
+        registration_timeout=180,
+        timeout=None,
+    ):
         """
         Will initiate commands to connect to operators network and wait until
-        connected.
+        connected. All registration and connection state transitions during
+        the connect are recorded in self.timeline.
+        If timeout is given the COPS command and the wait for registration
+        share it, so the whole connect takes at most timeout seconds.
+        Raises RegistrationDeniedError as soon as the network denies the
+        registration.
         """
         logger.info(f"Trying to connect to operator {operator} network")
+        self.timeline = AttachTimeline(operator)
+        try:
+            with self._accounted("connect", operator):
+                self._connect(
+                    operator, roaming, cops_timeout, registration_timeout, timeout
+                )
+        finally:
+            self.timeline.finish()
+
+    def _connect(
+        self,
+        operator: int,
+        roaming=False,
+        cops_timeout=300,
+        registration_timeout=180,
+        timeout=None,
+    ):
+        deadline = None if timeout is None else time.time() + timeout
         # TODO: Handle connection independent of home network or roaming.
         if self.registered:
             logger.info(
@@ -209,11 +504,21 @@ class SaraN211Module:
             else:
                 at_command = f"AT+COPS=0"
 
-            self._at_action(at_command, timeout=300)
-            self._await_connection(roaming or self.roaming)
+            self._at_action(at_command, timeout=_until(deadline, cops_timeout))
+            self._mark_timeline("COPS")
+            self._await_connection(
+                roaming or self.roaming, _until(deadline, registration_timeout)
+            )
             logger.info(f"Connected to {operator}")
             self.read_module_status()
 
+    def _mark_timeline(self, name, value=None):
+        """
+        Record a state transition on the timeline of the ongoing connect.
+        """
+        if self.timeline is not None and not self.timeline.finished:
+            self.timeline.mark(name, value)
+
     @property
     def registered(self):
 
@@ -225,6 +530,7 @@ class SaraN211Module:
 
         return self.registration_status == register_code
 
+    @serialized
     def create_socket(self, port: int, socket_type="UDP"):
         """
         Will return a socket-like object that mimics normal python
@@ -268,12 +574,25 @@ class SaraN211Module:
         sock = UDPSocket(socket_id, self, port)
         return sock
 
+    @serialized
+    def reopen_socket(self, sock):
+        """
+        Recreate a socket that was lost when the module rebooted. The socket
+        object is kept so it continues to work for whoever holds it.
+        """
+        new_sock = self._create_upd_socket(sock.source_port)
+        sock.socket_id = new_sock.socket_id
+        self.sockets[sock.socket_id] = sock
+        logger.info(f"Socket reopened as {sock.socket_id}")
+        return sock
+
     def _create_tcp_socket(self, port):
         """
         N211 module only supports UDP.
         """
         raise NotImplementedError("Sara211 does not support TCP")
 
+    @serialized
     def close_socket(self, socket_id):
         """
         Will send the correct AT action to close specified socket and remove
@@ -286,6 +605,7 @@ class SaraN211Module:
         del self.sockets[socket_id]
         return result
 
+    @serialized
     def send_udp_data(self, socket: int, host: str, port: int, data: bytes):
         """
         Send a UDP message
@@ -294,9 +614,11 @@ class SaraN211Module:
         _data = binascii.hexlify(data).upper().decode()
         length = len(data)
         atc = f'{self.AT_SEND_TO}={socket},"{host}",{port},{length},"{_data}"'
-        result = self._at_action(atc)
+        with self._accounted("send_udp_data", f"{host}:{port}"):
+            result = self._at_action(atc)
         return result
 
+    @serialized
     def receive_udp_data(self):
         """
         Recieve a UDP message
@@ -309,16 +631,51 @@ class SaraN211Module:
         logger.info(f"Recieved UDP message: {response}")
         return response
 
+    @serialized
+    def read_udp_data(self, socket: int, length: int):
+        """
+        Read data received on a socket without waiting for it.
+        :return: (ip, port, length, hex_data) or None if there is no data.
+        """
+        message = self._at_action(f"AT+NSORF={socket},{length}")
+        if not message:
+            # Any +NSONMI for the socket is outdated since there is no data.
+            self._remove_available_messages(socket)
+            return None
+        _socket, ip, port, _length, hex_data, remaining = parsers.parse_udp_message(
+            message[0]
+        )
+        if not remaining:
+            self._remove_available_messages(socket, count=1)
+        return ip, port, _length, hex_data
+
+    def _remove_available_messages(self, socket: int, count=None):
+        """
+        Remove the first count, or all, +NSONMI notifications for socket.
+        """
+        kept = list()
+        for message_info in self.available_messages:
+            if int(message_info.split(b",")[0]) == socket and count != 0:
+                if count is not None:
+                    count -= 1
+                continue
+            kept.append(message_info)
+        self.available_messages = kept
+
+    @serialized
     def ping(self, ip):
 
         logger.info(f"Sending ping to {ip}")
-        self._at_action(f'AT+NPING="{ip}"')
-        result = self._read_line_until_contains("+NPING", timeout=20, capture_urc=True)
-        ping_err = self._search_urc_result("+NPINGERR:", result)
-        ping_response = self._search_urc_result("+NPING:", result)
+        with self._accounted("ping", ip):
+            self._at_action(f'AT+NPING="{ip}"')
+            result = self._read_line_until_contains(
+                "+NPING", timeout=20, capture_urc=True
+            )
+        ping_err = parsers.search_urc_result(b"+NPINGERR:", result)
+        ping_response = parsers.search_urc_result(b"+NPING:", result)
 
         if ping_err:
-            err_cause = int(ping_err.rstrip()[-1])
+            err_cause = int(ping_err.rstrip()[-1:])
             err_map = {
                 1: "No response from remote host",
                 2: "Failed to send ping request",
@@ -326,17 +683,32 @@ class SaraN211Module:
             raise PingError(err_map.get(err_cause, "Error during ping"))
 
         if ping_response:
-            resp = ping_response.split(",")
-            return resp[1], resp[2]
+            resp = ping_response.split(b",")
+            return resp[1].decode(), resp[2].decode()
         else:
             return None
 
-    def _search_urc_result(self, urc_id, capture_urc_response):
-        for item in capture_urc_response:
-            if item.decode().startswith(urc_id):
-                return item.decode()
+    @contextmanager
+    def _accounted(self, operation, destination=None):
+        """
+        Accounts the airtime used within the context if accounting is enabled.
+        """
+        if self.accounting is None:
+            yield
+        else:
+            with self.accounting.measure(operation, destination):
+                yield
 
-        return None
+    @serialized
+    def process_pending_urcs(self):
+        """
+        Process URCs that the module has sent while we were not waiting for an
+        answer to an AT action.
+        """
+        while self._serial.in_waiting:
+            line = self._remove_line_ending(self._serial.read_until())
+            if line.startswith(b"+"):
+                self._process_urc(line)
 
     def _at_action(self, at_command, timeout=10, capture_urc=False):
         """
@@ -344,7 +716,21 @@ class SaraN211Module:
         OK. Some modules return answers to AT actions as URC:s before the OK
         and to handle them as IRCs it is possible to set the capture_urc flag
         and all URCs between the at action and OK will be returned as result.
+
+        Results of read-only queries are cached, see READ_ONLY_QUERIES. Any
+        other command invalidates all cached query results.
         """
+        if at_command not in self.READ_ONLY_QUERIES:
+            self._queries.invalidate()
+            return self._execute_at_action(at_command, timeout, capture_urc)
+
+        return self._queries.get(
+            (at_command, capture_urc),
+            lambda: self._execute_at_action(at_command, timeout, capture_urc),
+        )
+
+    @serialized
+    def _execute_at_action(self, at_command, timeout=10, capture_urc=False):
         logger.debug(f"Applying AT Command: {at_command}")
         self._write(at_command)
         time.sleep(0.02)  # To give the end devices some time to answer.
@@ -468,9 +854,8 @@ class SaraN211Module:
 
     @staticmethod
     def _parse_udp_response(message: bytes):
-        _message = message.replace(b'"', b"")
-        socket, ip, port, length, _data, remaining_bytes = _message.split(b",")
-        data = bytes.fromhex(_data.decode())
+        socket, ip, port, length, _data, remaining = parsers.parse_udp_message(message)
+        data = binascii.unhexlify(_data)
         return data
 
     def _process_urc(self, urc: bytes):
@@ -481,43 +866,46 @@ class SaraN211Module:
         collected we run this method to process them.
         """
 
-        _urc = urc.decode()
-        logger.debug(f"Processing URC: {_urc}")
-        urc_id = _urc[1 : _urc.find(":")]
-        if urc_id == "CSCON":
+        logger.debug(f"Processing URC: {urc}")
+        urc_id = parsers.urc_id(urc)
+        if urc_id in self.URC_INVALIDATES:
+            before = self.state.snapshot()
+            self._dispatch_urc(urc_id, urc)
+            if self.state.snapshot() != before:
+                self._queries.invalidate(self.URC_INVALIDATES[urc_id])
+        else:
+            self._dispatch_urc(urc_id, urc)
+
+    def _dispatch_urc(self, urc_id: bytes, urc: bytes):
+        if urc_id == b"CSCON":
             self._update_connection_status_callback(urc)
-        elif urc_id == "CEREG":
+        elif urc_id == b"NPSMR":
+            self._update_psm_status_callback(urc)
+        elif urc_id == b"CEREG":
             self._update_eps_reg_status_callback(urc)
-        elif urc_id == "CGPADDR":
+        elif urc_id == b"CGPADDR":
             self._update_ip_address_callback(urc)
-        elif urc_id == "NSONMI":
+        elif urc_id == b"NSONMI":
             self._add_available_message_callback(urc)
-        elif urc_id == "CGDCONT":
+        elif urc_id == b"CGDCONT":
             self._update_apn_callback(urc)
-        elif urc_id == "CGSN":
+        elif urc_id == b"CGSN":
             self._update_imei_callback(urc)
-        elif urc_id == "CCID":
+        elif urc_id == b"CCID":
             self._update_iccid_callback(urc)
-        elif urc_id == "CME ERROR":
+        elif urc_id == b"CME ERROR":
             self._handle_cme_error(urc)
         else:
             logger.debug(f"Unhandled urc: {urc}")
 
     def _update_iccid_callback(self, urc: bytes):
-        urc_string = urc.decode()
-        iccid = urc_string.split(":")[1].lstrip()
-        self.iccid = iccid
+        self.iccid = parsers.value(urc).decode()
 
     def _update_imei_callback(self, urc: bytes):
-        urc_string = urc.decode()
-        imei = urc_string.split(":")[1].lstrip()
-        self.imei = imei
+        self.imei = parsers.value(urc).decode()
 
     def _update_apn_callback(self, urc: bytes):
-        urc_string = urc.decode()
-        values = urc_string.split(",")
-        apn = values[2].replace('"', "")
-        self.apn = apn
+        self.apn = parsers.fields(urc)[2].decode()
 
     def _handle_cme_error(self, urc: bytes):
         """
@@ -529,11 +917,11 @@ class SaraN211Module:
         """
         Callback to handle recieved messages.
         """
-        _urc, data = urc.split(b":")
-        result = data.lstrip()
+        result = parsers.value(urc)
         logger.debug(f"Recieved data: {result}")
         self.available_messages.append(result)
 
+    @serialized
     def update_radio_statistics(self):
         """
         Read radio statistics and update the module object.
@@ -541,15 +929,35 @@ class SaraN211Module:
         radio_data = self._at_action(self.AT_RADIO_INFORMATION)
         self._parse_radio_stats(radio_data)
 
+    @serialized
+    def update_cell_statistics(self):
+        """
+        Read statistics of the serving and neighbour cells.
+        :return: list of CellStats
+        """
+        cell_data = self._at_action(self.AT_CELL_INFORMATION)
+        cells = [self._parse_cell_stats_string(item) for item in cell_data]
+        return [cell for cell in cells if cell]
+
     def _update_connection_status_callback(self, urc):
         """
         In the AT urc +CSCON: 1 the last char is indication if the
         connection is idle or connected
         """
-        status = bool(int(urc[-1]))
+        status = bool(int(chr(urc[-1])))
         self.connected = status
+        self._mark_timeline("CSCON", status)
         logger.info(f"Changed the connection status to {status}")
 
+    def _update_psm_status_callback(self, urc):
+        """
+        In the AT urc +NPSMR: 1 the last char indicates if the module has
+        entered Power Save Mode or is back in normal mode.
+        """
+        status = bool(int(chr(urc[-1])))
+        self.psm_active = status
+        logger.info(f"Changed the Power Save Mode status to {status}")
+
     def _update_eps_reg_status_callback(self, urc):
         """
         The command could return more than just the status.
@@ -558,6 +966,7 @@ class SaraN211Module:
         """
         status = int(chr(urc[-1]))
         self.registration_status = status
+        self._mark_timeline("CEREG", status)
         logger.info(f"Updated status EPS Registration = {status}")
 
     def _update_ip_address_callback(self, urc: bytes):
@@ -565,8 +974,9 @@ class SaraN211Module:
         Update the IP Address of the module
         """
         # TODO: this is per socket. Need to implement socket handling
-        _urc = urc.decode()
-        ip_addr = _urc[(_urc.find('"') + 1) : -1]
+        ip_addr = urc[(urc.find(b'"') + 1) : -1].decode()
+        if ip_addr != self.ip:
+            self._mark_timeline("IP", ip_addr)
         self.ip = ip_addr
         logger.info(f"Updated the IP Address of the module to {ip_addr}")
 
@@ -574,53 +984,26 @@ class SaraN211Module:
         """
         Parser for radio statistic result
         """
-        stats = [self._parse_radio_stats_string(item) for item in irc_buffer]
-
-        for stat in stats:
+        for item in irc_buffer:
+            stat = parsers.parse_nuestats(item)
             if not stat:
                 continue
-            if stat.type == "RADIO" and stat.name == "Signal power":
-                self.radio_signal_power = stat.value / 10
-            elif stat.type == "RADIO" and stat.name == "Total power":
-                self.radio_total_power = stat.value / 10
-            elif stat.type == "RADIO" and stat.name == "TX power":
-                self.radio_tx_power = stat.value / 10
-            elif stat.type == "RADIO" and stat.name == "TX time":
-                self.radio_tx_time = stat.value
-            elif stat.type == "RADIO" and stat.name == "RX time":
-                self.radio_rx_time = stat.value
-            elif stat.type == "RADIO" and stat.name == "Cell ID":
-                self.radio_cell_id = stat.value
-            elif stat.type == "RADIO" and stat.name == "ECL":
-                self.radio_ecl = stat.value
-            elif stat.type == "RADIO" and stat.name == "SNR":
-                self.radio_snr = stat.value
-            elif stat.type == "RADIO" and stat.name == "EARFCN":
-                self.radio_earfcn = stat.value
-            elif stat.type == "RADIO" and stat.name == "PCI":
-                self.radio_pci = stat.value
-            elif stat.type == "RADIO" and stat.name == "RSRQ":
-                self.radio_rsrq = stat.value
+            stat_type, name, value = stat
+            attribute = self.RADIO_STATS.get(name) if stat_type == b"RADIO" else None
+            if attribute:
+                attribute_name, divisor = attribute
+                setattr(self, attribute_name, value / divisor if divisor else value)
             else:
                 logger.debug(f"Unhandled statistics data: {stat}")
 
     @staticmethod
-    def _parse_radio_stats_string(stats_byte_string: bytes):
+    def _parse_cell_stats_string(stats_byte_string: bytes):
         """
-        The string is like: b'NUESTATS: "RADIO","Signal power",-682'
+        The string is like: b'NUESTATS: "CELL",3569,69,1,-1020,-108,-908,36'
         :param stats_byte_string:
-        :return: NamedTuple Stats
+        :return: NamedTuple CellStats
         """
-        parts = stats_byte_string.decode().split(":")
-
-        irc: str = parts[0].strip()
-        data: str = parts[1].strip().replace('"', "")
-
-        data_parts = data.split(",")
-        if irc == "NUESTATS":
-            return Stats(data_parts[0], data_parts[1], int(data_parts[2]))
-        else:
-            return None
+        return parsers.parse_cell_stats(stats_byte_string)
 
     def __repr__(self):
         return f'NBIoTModule(serial_port="{self._serial_port}")'
@@ -629,15 +1012,36 @@ class SaraN211Module:
         """
         The process to verify that connection has occured is a bit different on
         different devices. On N211 we need to wait intil we get the +CERREG: x
-        URC.
+        URC. If the network denies the registration we stop waiting directly.
         """
 
         logging.info(f"Awaiting Connection")
 
         if roaming:
-            self._read_line_until_contains("CEREG: 5", timeout=timeout)
+            register_code = 5
         else:
-            self._read_line_until_contains("CEREG: 1", timeout=timeout)
+            register_code = 1
+
+        start_time = time.time()
+        while self.registration_status != register_code:
+            remaining = timeout - (time.time() - start_time)
+            try:
+                self._read_line_until_contains("CEREG", timeout=max(remaining, 0))
+            except ATTimeoutError:
+                raise ConnectionTimeoutError(f"Not registered within {timeout} s")
+
+            if self.registration_status == self.REGISTRATION_DENIED:
+                raise RegistrationDeniedError("Registration denied by network")
+
+    @serialized
+    def deregister(self):
+        """
+        Deregister from the network.
+        """
+        self._at_action(self.AT_DEREGISTER, timeout=60)
+        self.registration_status = 0
+        self.ip = None
+        logger.info("Deregistered from network")
 
     def set_pdp_context(self, apn, pdp_type="IP", cid=1):
         logger.info(f"Setting PDP Context")
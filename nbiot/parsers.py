@@ -0,0 +1,81 @@
+from collections import namedtuple
+
+Stats = namedtuple("Stats", "type name value")
+CellStats = namedtuple("CellStats", "earfcn pci primary rsrp rsrq rssi snr")
+
+
+def urc_id(line: bytes):
+    """
+    The id of a URC, ex. b"CEREG" from b"+CEREG: 1"
+    """
+    end = line.find(b":")
+    if end == -1:
+        return line[1:]
+    return line[1:end]
+
+
+def value(line: bytes):
+    """
+    Everything after the first colon, ex. b'1,"IP"' from b'+CGDCONT: 1,"IP"'
+    """
+    return line[line.find(b":") + 1 :].lstrip()
+
+
+def fields(line: bytes):
+    """
+    The comma separated fields of the value of a line without quotes.
+    """
+    return [field.strip(b'"') for field in value(line).split(b",")]
+
+
+def parse_nuestats(line: bytes):
+    """
+    The line is like: b'NUESTATS: "RADIO","Signal power",-682'
+    :return: (type, name, value) or None if it is not NUESTATS
+    """
+    if not line.startswith(b"NUESTATS:"):
+        return None
+    stat_type, name, stat_value = fields(line)[:3]
+    return stat_type, name, int(stat_value)
+
+
+def parse_cell_stats(line: bytes):
+    """
+    The line is like: b'NUESTATS: "CELL",3569,69,1,-1020,-108,-908,36'
+    RSRP and RSSI are reported in tenths of dBm, RSRQ and SNR in tenths of dB.
+    :return: CellStats in dBm and dB or None if it is not cell statistics
+    """
+    if not line.startswith(b'NUESTATS: "CELL"') and not line.startswith(
+        b"NUESTATS: CELL"
+    ):
+        return None
+    earfcn, pci, primary, rsrp, rsrq, rssi, snr = map(int, fields(line)[1:8])
+    return CellStats(
+        earfcn, pci, bool(primary), rsrp / 10, rsrq / 10, rssi / 10, snr / 10
+    )
+
+
+def parse_udp_message(line: bytes):
+    """
+    The line is like: b'0,"192.168.5.1",1024,2,"ABAB",0'
+    :return: (socket, ip, port, length, hex_data, remaining_bytes)
+    """
+    socket, ip, port, length, hex_data, remaining = line.split(b",")
+    return (
+        int(socket),
+        ip.strip(b'"'),
+        int(port),
+        int(length),
+        hex_data.strip(b'"'),
+        int(remaining),
+    )
+
+
+def search_urc_result(urc_prefix: bytes, lines):
+    """
+    The first line starting with urc_prefix or None
+    """
+    for line in lines:
+        if line.startswith(urc_prefix):
+            return line
+    return None
@@ -0,0 +1,145 @@
+"""
+pyserial URL handler for a simulated SARA N211, used as ``--port sim://``.
+
+Options are given as a query string, ex. ``sim://?attach_delay=2&roaming=1``.
+See SimulatedN211 for the options.
+"""
+
+import time
+import threading
+import urllib.parse
+
+from serial.serialutil import SerialBase, SerialException, PortNotOpenError
+
+from .simulator import SimulatedN211
+
+OPTIONS = {
+    "attach_delay": float,
+    "boot_delay": float,
+    "inactivity_timer": float,
+    "rtt": float,
+    "roaming": lambda value: value not in ("0", "false", "False"),
+}
+
+
+class Serial(SerialBase):
+    """
+    Serial port connected to a SimulatedN211 instead of a module.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.modem = None
+        self._buffer = bytearray()
+        self._line = bytearray()
+        self._condition = threading.Condition()
+        super().__init__(*args, **kwargs)
+
+    def open(self):
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        self.modem = SimulatedN211(self._output, **self.from_url(self.port))
+        self.is_open = True
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.modem.close()
+            with self._condition:
+                self._condition.notify_all()
+        super().close()
+
+    def from_url(self, url):
+        """
+        The options for SimulatedN211 in the URL.
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme != "sim":
+            raise SerialException(f"Expected a sim:// URL, got {url!r}")
+        options = dict()
+        for name, values in urllib.parse.parse_qs(parts.query).items():
+            if name not in OPTIONS:
+                raise SerialException(f"Unknown option {name!r} in {url!r}")
+            options[name] = OPTIONS[name](values[0])
+        return options
+
+    def _reconfigure_port(self):
+        pass
+
+    def _update_rts_state(self):
+        pass
+
+    def _update_dtr_state(self):
+        pass
+
+    def _update_break_state(self):
+        pass
+
+    def _output(self, data):
+        with self._condition:
+            self._buffer += data
+            self._condition.notify_all()
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        with self._condition:
+            return len(self._buffer)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise PortNotOpenError()
+        deadline = None if self._timeout is None else time.time() + self._timeout
+        with self._condition:
+            while len(self._buffer) < size and self.is_open:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def read_until(self, expected=b"\n", size=None):
+        """
+        Faster than the byte by byte read of SerialBase since the whole
+        output is in memory.
+        """
+        if not self.is_open:
+            raise PortNotOpenError()
+        deadline = None if self._timeout is None else time.time() + self._timeout
+        with self._condition:
+            while True:
+                end = self._buffer.find(expected)
+                if end != -1:
+                    end += len(expected)
+                    break
+                remaining = None if deadline is None else deadline - time.time()
+                if not self.is_open or (remaining is not None and remaining <= 0):
+                    end = len(self._buffer)
+                    break
+                self._condition.wait(remaining)
+            if size is not None:
+                end = min(end, size)
+            data = bytes(self._buffer[:end])
+            del self._buffer[:end]
+        return data
+
+    def write(self, data):
+        if not self.is_open:
+            raise PortNotOpenError()
+        self._line += data
+        while b"\r" in self._line:
+            line, _, rest = self._line.partition(b"\r")
+            self._line = bytearray(rest.lstrip(b"\n"))
+            self.modem.handle(bytes(line))
+        return len(data)
+
+    def reset_input_buffer(self):
+        with self._condition:
+            self._buffer.clear()
+
+    def reset_output_buffer(self):
+        self._line.clear()
@@ -0,0 +1,107 @@
+import time
+import logging
+from collections import namedtuple
+
+from .module import ATError, CMEError
+
+logger = logging.getLogger(__name__)
+
+RecoveryRecord = namedtuple("RecoveryRecord", "started duration error steps")
+
+
+class RecoveryManager:
+    """
+    Recovers a module from errors that leaves it in an unknown state, without
+    rebooting it.
+
+    The serial line is resynchronized and the registration is read back from
+    the module. Only the steps that were lost are redone: URCs and the radio
+    are enabled again if the module has restarted by itself, the module
+    reconnects if it is no longer registered and sockets are recreated if they
+    are gone.
+    """
+
+    RECOVERABLE_ERRORS = (ATError, CMEError, ValueError)
+
+    def __init__(self, module, operator=None, max_attempts=1):
+        self.module = module
+        self.operator = operator
+        self.max_attempts = max_attempts
+        self.records = list()
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run fn and recover and retry if it fails with a recoverable error.
+        """
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except self.RECOVERABLE_ERRORS as e:
+                if attempt >= self.max_attempts:
+                    raise
+                attempt += 1
+                logger.warning(f"{fn.__name__} failed with {e!r}, recovering")
+                self.recover(e)
+
+    def recover(self, error=None):
+        """
+        Bring the module back to a known state.
+        :return: RecoveryRecord
+        """
+        return self.module.run_transaction(self._recover, error)
+
+    def _recover(self, error):
+        module = self.module
+        started = time.time()
+        steps = list()
+        sockets = dict(module.sockets)
+
+        restarted = module.resynchronize()
+        steps.append("resynchronize")
+
+        # A restart prints the boot banner and, unless autoconnect is enabled,
+        # leaves the radio off.
+        if restarted or module.read_radio_functionality() == 0:
+            module._reset_after_reboot()
+            module.enable_signaling_connection_urc()
+            module.enable_network_registration()
+            module.enable_radio_functions()
+            steps.append("enable urcs")
+        # URCs with registration changes may have been thrown away when
+        # resynchronizing, so read the state back from the module.
+        module._at_action("AT+CEREG?")
+        module._at_action(module.AT_CHECK_CONNECTION_STATUS)
+
+        if not module.registered:
+            operator = self.operator
+            if operator is None and module.timeline is not None:
+                operator = module.timeline.operator
+            module.connect(operator)
+            steps.append("connect")
+        elif not module.ip:
+            module._at_action(module.AT_GET_IP)
+            steps.append("read ip")
+
+        lost_sockets = [
+            sock
+            for socket_id, sock in sockets.items()
+            if socket_id not in module.sockets
+        ]
+        for sock in lost_sockets:
+            module.reopen_socket(sock)
+        if lost_sockets:
+            steps.append("recreate sockets")
+
+        record = RecoveryRecord(
+            started, time.time() - started, repr(error) if error else None, steps
+        )
+        logger.info(
+            f"Recovered in {record.duration:.2f} s with steps: {', '.join(steps)}"
+        )
+        self.records.append(record)
+        return record
+
+    @property
+    def total_downtime(self):
+        return sum(record.duration for record in self.records)
@@ -1,23 +1,28 @@
 import click
 import tabulate
-from .module import SaraN211Module, PingError
+import time
+from .module import SaraN211Module, PingError, ATError, CMEError
+from .cells import CellIndex
+from .config import ModemConfig
+from .coverage import TileIndex, GeoSurvey
+from .gps import GPSReader
+from .recovery import RecoveryManager
+from .scenario import Scenario, ScenarioRunner
+from .survey import OperatorSurvey, AttachBound
+from .udpbench import UDPBenchmark, echo_server as _echo_server
+from .utils import summarize
 
 
-def connect_module(module: SaraN211Module, app_ctx):
-    click.echo(click.style(f"Connecting to network...", fg="yellow", bold=True))
+def configure_module(module: SaraN211Module, app_ctx):
     module.read_module_status()
-    if app_ctx.apn:
-        module.set_pdp_context(apn=app_ctx.apn)
-
-    module.enable_signaling_connection_urc()
-    module.enable_network_registration()
-    module.enable_radio_functions()
-    if app_ctx.psm:
-        module.enable_psm_mode()
-    else:
-        module.disable_psm_mode()
-
-    module.connect(app_ctx.mno)
+    config = ModemConfig(psm=app_ctx.psm, apn=app_ctx.apn)
+    config.apply(module)
+
+
+def connect_module(module: SaraN211Module, app_ctx, mno=None):
+    click.echo(click.style(f"Connecting to network...", fg="yellow", bold=True))
+    configure_module(module, app_ctx)
+    module.connect(mno or app_ctx.mno)
     click.echo(click.style(f"Connected!", fg="yellow", bold=True))
 
 
@@ -39,6 +44,24 @@ def connect(app_ctx):
             fg="red",
         )
     )
+    if module.timeline.events:
+        click.echo("\nAttach timeline:")
+        data = [
+            (f"{event.elapsed:.2f} s", event.name, event.value)
+            for event in module.timeline.events
+        ]
+        click.echo(
+            click.style(
+                tabulate.tabulate(
+                    data,
+                    headers=["Time", "Event", "Value"],
+                    tablefmt="github",
+                    numalign="left",
+                    stralign="left",
+                ),
+                fg="red",
+            )
+        )
 
 
 @click.command()
@@ -118,5 +141,402 @@ def reboot(app_ctx):
     """
     module: SaraN211Module = app_ctx.module
     click.echo(click.style(f"Rebooting module {module}...", fg="red", bold=True))
-    module.reboot()
-    click.echo(click.style(f"Module rebooted", fg="red", bold=True))
+    boot_time = module.reboot()
+    click.echo(
+        click.style(f"Module rebooted in {boot_time:.2f} s", fg="red", bold=True)
+    )
+
+
+@click.command("attach-bench")
+@click.option("--cycles", "-c", default=5, help="Reboot and connect cycles per MNO")
+@click.option(
+    "--operator",
+    "-o",
+    "operators",
+    multiple=True,
+    help="MNO to benchmark, can be given multiple times. Defaults to --mno",
+)
+@click.pass_obj
+def attach_bench(app_ctx, cycles, operators):
+    """
+    Reboot and connect repeatedly and report time to register and time to IP
+    """
+    module: SaraN211Module = app_ctx.module
+    operators = operators or [app_ctx.mno]
+
+    results = list()
+    for operator in operators:
+        register_times = list()
+        ip_times = list()
+        failures = 0
+        # Cycles where the module registered on its own after the reboot,
+        # ex. with autoconnect, so connect had nothing to time.
+        skipped = 0
+        for cycle in range(0, cycles):
+            click.echo(click.style(f"MNO {operator}, cycle {cycle + 1}", fg="blue"))
+            module.reboot()
+            try:
+                connect_module(module, app_ctx, mno=operator)
+            except ATError as e:
+                failures += 1
+                click.echo(click.style(f"**\tFailed: {e!r}\t**", fg="red", bold=True))
+                continue
+            timeline = module.timeline
+            if timeline.time_to_register is None:
+                skipped += 1
+                click.echo(
+                    click.style(
+                        "**\tAlready registered after reboot, not sampled. "
+                        "Is autoconnect enabled?\t**",
+                        fg="yellow",
+                        bold=True,
+                    )
+                )
+                continue
+            register_times.append(timeline.time_to_register)
+            if timeline.time_to_ip is not None:
+                ip_times.append(timeline.time_to_ip)
+            click.echo(
+                click.style(
+                    f"Registered after {timeline.time_to_register} s, "
+                    f"IP after {timeline.time_to_ip} s",
+                    fg="red",
+                )
+            )
+
+        for name, times in (("Register", register_times), ("IP", ip_times)):
+            results.append(
+                (operator, name, len(times), failures, skipped)
+                + tuple(_format_seconds(value) for value in summarize(times))
+            )
+
+    click.echo("\nResults:")
+    click.echo(
+        click.style(
+            tabulate.tabulate(
+                results,
+                headers=[
+                    "MNO",
+                    "Time to",
+                    "Runs",
+                    "Failed",
+                    "Skipped",
+                    "Min",
+                    "Median",
+                    "P90",
+                    "Max",
+                ],
+                tablefmt="github",
+                numalign="left",
+                stralign="left",
+            ),
+            fg="red",
+        )
+    )
+
+
+def _format_seconds(value):
+    if value is None:
+        return "-"
+    return f"{value:.2f} s"
+
+
+@click.command()
+@click.option("--interval", "-i", default=5.0, help="Seconds between polls")
+@click.option("--count", "-c", default=0, help="Number of polls, 0 polls forever")
+@click.option(
+    "--max-age", default=60.0, help="Seconds before a cell not seen is removed"
+)
+@click.option("--top", "-t", default=10, help="How many cells to show")
+@click.pass_obj
+def cells(app_ctx, interval, count, max_age, top):
+    """
+    Scan serving and neighbour cells continuously.
+    """
+    module: SaraN211Module = app_ctx.module
+    connect_module(module, app_ctx)
+    click.echo(click.style(f"Scanning cells...", fg="blue"))
+
+    index = CellIndex(max_age=max_age)
+    polls = 0
+    try:
+        while not count or polls < count:
+            index.update_all(module.update_cell_statistics())
+            polls += 1
+            best = index.best()
+            data = [
+                (
+                    "*" if entry is best else "",
+                    entry.earfcn,
+                    entry.pci,
+                    f"{entry.rsrp.last} dBm",
+                    f"{entry.rsrp.mean:.1f} dBm",
+                    f"{entry.rsrq.last} dB",
+                    f"{entry.snr.last} dB",
+                    entry.rsrp.count,
+                    f"{time.time() - entry.last_seen:.0f} s",
+                )
+                for entry in index.ranked(top)
+            ]
+            click.echo(f"\nPoll {polls}, {len(index)} cells:")
+            click.echo(
+                click.style(
+                    tabulate.tabulate(
+                        data,
+                        headers=[
+                            "Best",
+                            "EARFCN",
+                            "PCI",
+                            "RSRP",
+                            "Mean RSRP",
+                            "RSRQ",
+                            "SNR",
+                            "Samples",
+                            "Last seen",
+                        ],
+                        tablefmt="github",
+                        numalign="left",
+                        stralign="left",
+                    ),
+                    fg="red",
+                )
+            )
+            if not count or polls < count:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+@click.command("udp-bench")
+@click.argument("host")
+@click.argument("port", type=int)
+@click.option("--size", "-s", default=64, help="Datagram size in bytes")
+@click.option("--rate", "-r", default=1.0, help="Datagrams per second")
+@click.option("--count", "-c", default=20, help="How many datagrams to send")
+@click.option("--local-port", default=None, type=int, help="Local port of socket")
+@click.option(
+    "--wait", default=10.0, help="Seconds to wait for echoes after the last send"
+)
+@click.pass_obj
+def udp_bench(app_ctx, host, port, size, rate, count, local_port, wait):
+    """
+    Benchmark UDP throughput and round trip time against an echo server
+    """
+    module: SaraN211Module = app_ctx.module
+    connect_module(module, app_ctx)
+    click.echo(click.style(f"Benchmarking UDP to {host}:{port}", fg="blue"))
+
+    sock = module.create_socket(local_port)
+    try:
+        benchmark = UDPBenchmark(
+            sock, (host, port), size=size, rate=rate, count=count, wait=wait
+        )
+        result = benchmark.run()
+    finally:
+        sock.close()
+
+    data = list()
+    data.append(("Sent", result.sent))
+    data.append(("Received", result.received))
+    data.append(("Loss", f"{result.loss:.1f} %"))
+    data.append(("Reordered", result.reordered))
+    data.append(("Duplicates", result.duplicates))
+    data.append(("Goodput", f"{result.goodput:.1f} B/s"))
+    for pct in (50, 90, 99):
+        rtt = result.rtt_percentile(pct)
+        data.append((f"RTT p{pct}", f"{rtt:.0f} ms" if rtt is not None else "-"))
+    click.echo(
+        click.style(
+            tabulate.tabulate(
+                data,
+                headers=["Stat", "Value"],
+                tablefmt="github",
+                numalign="left",
+                stralign="left",
+            ),
+            fg="red",
+        )
+    )
+
+
+@click.command("echo-server")
+@click.option("--host", default="0.0.0.0", help="Address to listen on")
+@click.option("--port", default=9000, help="UDP port to listen on")
+def echo_server(host, port):
+    """
+    Run a UDP echo server for udp-bench
+    """
+    server = _echo_server(host, port)
+    click.echo(click.style(f"Echoing UDP on {host}:{port}", fg="blue"))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@click.command()
+@click.option(
+    "--operator",
+    "-o",
+    "operators",
+    multiple=True,
+    required=True,
+    help="MNO to survey, give it multiple times to compare MNOs",
+)
+@click.option("--max-timeout", default=180, help="Max seconds to wait for registration")
+@click.option("--min-timeout", default=30, help="Min seconds to wait for registration")
+@click.pass_obj
+def survey(app_ctx, operators, max_timeout, min_timeout):
+    """
+    Compare coverage of several MNOs
+    """
+    module: SaraN211Module = app_ctx.module
+    click.echo(click.style(f"Surveying {len(operators)} MNOs...", fg="blue"))
+    configure_module(module, app_ctx)
+
+    bound = AttachBound(default=max_timeout, minimum=min_timeout)
+    header = ["MNO", "Status", "Register", "IP", "Timeout", "ECL", "RSRQ", "SNR"]
+    results = list()
+    for result in OperatorSurvey(module, operators, bound=bound).run():
+        row = (
+            result.operator,
+            result.status,
+            _format_seconds(result.time_to_register),
+            _format_seconds(result.time_to_ip),
+            _format_seconds(result.timeout),
+            result.snapshot.radio_ecl,
+            result.snapshot.radio_rsrq,
+            result.snapshot.radio_snr,
+        )
+        results.append(row)
+        click.echo(click.style(" | ".join(str(value) for value in row), fg="red"))
+        if result.error:
+            click.echo(click.style(f"**\t{result.error}\t**", fg="red", bold=True))
+
+    click.echo("\nResults:")
+    click.echo(
+        click.style(
+            tabulate.tabulate(
+                results, header, tablefmt="github", numalign="left", stralign="left"
+            ),
+            fg="red",
+        )
+    )
+
+
+@click.command()
+@click.option("--gps-port", required=True, help="Serial port of the GPS receiver")
+@click.option("--gps-baudrate", default=9600, help="Baudrate of the GPS receiver")
+@click.option("--interval", "-i", default=5.0, help="Seconds between samples")
+@click.option("--count", "-c", default=0, help="Number of samples, 0 runs forever")
+@click.option("--tile-size", default=100, help="Size of the tiles in meters")
+@click.option(
+    "--max-fix-age", default=5.0, help="Max seconds between a sample and a GPS fix"
+)
+@click.option(
+    "--output", "-o", default="coverage.geojson", help="GeoJSON file to write"
+)
+@click.pass_obj
+def geosurvey(
+    app_ctx, gps_port, gps_baudrate, interval, count, tile_size, max_fix_age, output
+):
+    """
+    Survey coverage with GPS positions and export GeoJSON
+    """
+    module: SaraN211Module = app_ctx.module
+    connect_module(module, app_ctx)
+
+    gps = GPSReader(gps_port, baudrate=gps_baudrate)
+    index = TileIndex(tile_size=tile_size)
+    survey = GeoSurvey(module, gps, index, max_fix_age=max_fix_age)
+    click.echo(click.style(f"Surveying coverage, writing to {output}", fg="blue"))
+
+    gps.start()
+    samples = 0
+    try:
+        while not count or samples < count:
+            try:
+                survey.sample()
+            except (ATError, CMEError) as e:
+                click.echo(click.style(f"**\t{e!r}\t**", fg="red", bold=True))
+            samples += 1
+            survey.process()
+            index.write_geojson(output)
+            click.echo(
+                click.style(
+                    f"Samples: {survey.joined} positioned, {survey.unjoined} without "
+                    f"fix, ECL: {module.radio_ecl}, RSRQ: {survey.last_rsrq} dB, "
+                    f"tiles: {len(index)}",
+                    fg="red",
+                )
+            )
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        survey.process(flush=True)
+        index.write_geojson(output)
+        gps.stop()
+
+
+@click.command()
+@click.argument("scenario_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--results", "-o", default="results.csv", help="CSV file to write results to"
+)
+@click.option("--tick", default=1.0, help="Scheduling resolution in seconds")
+@click.option("--recover", is_flag=True, help="Recover and retry failed operations")
+@click.pass_obj
+def scenario(app_ctx, scenario_file, results, tick, recover):
+    """
+    Run a soak test scenario from a JSON file
+    """
+    module: SaraN211Module = app_ctx.module
+    workload = Scenario.load(scenario_file)
+    connect_module(module, app_ctx)
+    click.echo(
+        click.style(
+            f"Running {len(workload.operations)} operations for "
+            f"{workload.duration:.0f} s, writing to {results}",
+            fg="blue",
+        )
+    )
+
+    runner = ScenarioRunner(
+        module,
+        workload,
+        results,
+        tick=tick,
+        reconnect=lambda: connect_module(module, app_ctx),
+        recovery=RecoveryManager(module, operator=app_ctx.mno) if recover else None,
+    )
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        pass
+
+    data = [
+        row[:3] + tuple(_format_millis(value) for value in row[3:])
+        for row in runner.summary()
+    ]
+    click.echo("\nResults:")
+    click.echo(
+        click.style(
+            tabulate.tabulate(
+                data,
+                headers=["Operation", "Runs", "Failed", "Min", "Median", "P90", "Max"],
+                tablefmt="github",
+                numalign="left",
+                stralign="left",
+            ),
+            fg="red",
+        )
+    )
+
+
+def _format_millis(value):
+    if value is None:
+        return "-"
+    return f"{value:.0f} ms"
@@ -0,0 +1,193 @@
+import csv
+import json
+import math
+import time
+import logging
+from collections import namedtuple
+
+from .module import ATError, CMEError, PingError
+from .utils import summarize
+
+logger = logging.getLogger(__name__)
+
+Operation = namedtuple(
+    "Operation", "name type interval start host port local_port size"
+)
+
+OPERATION_TYPES = ("send", "receive", "ping", "stats", "reboot")
+
+OPERATION_ERRORS = (ATError, CMEError, PingError, IOError, ValueError)
+
+
+class Scenario:
+    """
+    A declarative workload. The scenario file is JSON like:
+
+        {
+            "duration": 86400,
+            "operations": [
+                {"name": "upload", "type": "send", "interval": 900,
+                 "host": "203.0.113.10", "port": 9000, "size": 64},
+                {"name": "downlink", "type": "receive", "interval": 300,
+                 "local_port": 9000, "size": 512},
+                {"name": "stats", "type": "stats", "interval": 60},
+                {"name": "ping", "type": "ping", "interval": 600,
+                 "host": "203.0.113.10"},
+                {"name": "reboot", "type": "reboot", "interval": 43200}
+            ]
+        }
+
+    Intervals, start offsets and duration are in seconds.
+    """
+
+    def __init__(self, duration, operations):
+        self.duration = duration
+        self.operations = operations
+
+    @classmethod
+    def from_dict(cls, data):
+        operations = list()
+        for item in data["operations"]:
+            if item.get("type") not in OPERATION_TYPES:
+                raise ValueError(f"Unknown operation type in {item}")
+            if item["type"] in ("send", "ping") and not item.get("host"):
+                raise ValueError(f"Operation {item} needs a host")
+            operations.append(
+                Operation(
+                    name=item.get("name", item["type"]),
+                    type=item["type"],
+                    interval=float(item["interval"]),
+                    start=float(item.get("start", 0)),
+                    host=item.get("host"),
+                    port=item.get("port"),
+                    local_port=item.get("local_port"),
+                    size=int(item.get("size", 64)),
+                )
+            )
+        return cls(float(data["duration"]), operations)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel. Scheduling and advancing one tick is constant time
+    independent of how many operations are scheduled.
+    """
+
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self.slots = [list() for _ in range(slots)]
+        self.current_tick = 0
+
+    def schedule(self, delay, item):
+        """
+        Schedule item delay seconds from the current tick, at least one tick.
+        """
+        ticks = max(1, math.ceil(delay / self.tick))
+        target = self.current_tick + ticks
+        self.slots[target % len(self.slots)].append((target, item))
+
+    def advance(self):
+        """
+        Move one tick forward and return the items that are due.
+        """
+        self.current_tick += 1
+        slot = self.slots[self.current_tick % len(self.slots)]
+        due = [item for target, item in slot if target <= self.current_tick]
+        if due:
+            slot[:] = [entry for entry in slot if entry[0] > self.current_tick]
+        return due
+
+
+class ScenarioRunner:
+    """
+    Runs a scenario against a module and writes the latency and outcome of
+    every operation to a CSV results file.
+
+    If the module needs to be connected again after a reboot give a reconnect
+    callable. A RecoveryManager can be given to recover from errors.
+    """
+
+    RESULT_HEADER = ["time", "operation", "latency_ms", "ok", "error"]
+
+    def __init__(
+        self, module, scenario, results_path, tick=1.0, reconnect=None, recovery=None
+    ):
+        self.module = module
+        self.scenario = scenario
+        self.results_path = results_path
+        self.wheel = TimingWheel(tick=tick)
+        self.reconnect = reconnect
+        self.recovery = recovery
+        self.latencies = {op.name: list() for op in scenario.operations}
+        self.failures = {op.name: 0 for op in scenario.operations}
+
+    def _execute(self, operation: Operation):
+        module = self.module
+        if operation.type == "send":
+            module.socket_pool.sendto(
+                bytes(operation.size),
+                (operation.host, operation.port),
+                port=operation.local_port,
+            )
+        elif operation.type == "receive":
+            sock = module.socket_pool.get(operation.local_port)
+            module.read_udp_data(sock.socket_id, operation.size)
+        elif operation.type == "ping":
+            module.ping(operation.host)
+        elif operation.type == "stats":
+            module.update_radio_statistics()
+        elif operation.type == "reboot":
+            module.reboot()
+            if self.reconnect:
+                self.reconnect()
+
+    def _run_operation(self, operation: Operation, writer):
+        started = time.time()
+        error = None
+        try:
+            if self.recovery:
+                self.recovery.run(self._execute, operation)
+            else:
+                self._execute(operation)
+        except OPERATION_ERRORS as e:
+            error = repr(e)
+            self.failures[operation.name] += 1
+            logger.warning(f"Operation {operation.name} failed: {error}")
+        latency = (time.time() - started) * 1000
+        self.latencies[operation.name].append(latency)
+        writer.writerow(
+            [f"{started:.3f}", operation.name, f"{latency:.0f}", int(not error), error]
+        )
+
+    def run(self):
+        for operation in self.scenario.operations:
+            self.wheel.schedule(operation.start, operation)
+
+        with open(self.results_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.RESULT_HEADER)
+            start_time = time.monotonic()
+            while True:
+                next_tick = start_time + (self.wheel.current_tick + 1) * self.wheel.tick
+                if next_tick - start_time > self.scenario.duration:
+                    break
+                # If operations took longer than a tick we catch up directly.
+                time.sleep(max(0.0, next_tick - time.monotonic()))
+                for operation in self.wheel.advance():
+                    self._run_operation(operation, writer)
+                    self.wheel.schedule(operation.interval, operation)
+                f.flush()
+
+    def summary(self):
+        """
+        Rows of operation, runs, failures, min, median, p90 and max latency.
+        """
+        return [
+            (name, len(latencies), self.failures[name]) + summarize(latencies)
+            for name, latencies in self.latencies.items()
+        ]
@@ -0,0 +1,106 @@
+import time
+import logging
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+QueuedDatagram = namedtuple("QueuedDatagram", "queued_at socket host port data")
+
+
+class PSMScheduler:
+    """
+    Queues outbound UDP datagrams and sends them in bursts while the radio is
+    already connected, instead of waking the radio for every message.
+
+    The signaling connection status (+CSCON) and Power Save Mode status (+NPSMR)
+    are tracked from the URCs of the module, so the module should have them
+    enabled. If the radio does not wake up by itself the queue is flushed when
+    the oldest datagram has waited max_delay seconds.
+
+    Call poll() regularly to process URCs and send what is due.
+    """
+
+    def __init__(self, module, max_delay=60):
+        self.module = module
+        self.max_delay = max_delay
+        self.queue = deque()
+        self.sent = 0
+        self.wakeups = 0
+        self.wakeups_avoided = 0
+
+    def send(self, socket: int, host: str, port: int, data: bytes):
+        """
+        Queue a datagram. It is sent directly if the radio is connected.
+        """
+        self.queue.append(QueuedDatagram(time.time(), socket, host, port, data))
+        logger.debug(f"Queued UDP message to {host}:{port}, {len(self.queue)} queued")
+        self.poll()
+
+    def poll(self):
+        """
+        Process pending URCs and flush the queue if it is due.
+        """
+        self.module.process_pending_urcs()
+        if self.due:
+            self.flush()
+
+    @property
+    def due(self):
+        if not self.queue:
+            return False
+        if self.radio_awake:
+            return True
+        return time.time() - self.queue[0].queued_at >= self.max_delay
+
+    @property
+    def radio_awake(self):
+        return self.module.connected and not self.module.psm_active
+
+    @property
+    def next_deadline(self):
+        """
+        Time when the oldest queued datagram has to be sent, or None
+        """
+        if not self.queue:
+            return None
+        return self.queue[0].queued_at + self.max_delay
+
+    def flush(self):
+        """
+        Send all queued datagrams in one burst.
+        """
+        if not self.queue:
+            return
+        radio_awake = self.radio_awake
+        batch_size = len(self.queue)
+        logger.info(
+            f"Sending {batch_size} queued UDP messages, radio awake: {radio_awake}"
+        )
+        while self.queue:
+            datagram = self.queue[0]
+            self.module.send_udp_data(
+                socket=datagram.socket,
+                host=datagram.host,
+                port=datagram.port,
+                data=datagram.data,
+            )
+            self.queue.popleft()
+            self.sent += 1
+
+        if radio_awake:
+            self.wakeups_avoided += batch_size
+        else:
+            self.wakeups += 1
+            self.wakeups_avoided += batch_size - 1
+
+    def close(self):
+        """
+        Send whatever is left in the queue.
+        """
+        self.flush()
+
+    def __repr__(self):
+        return (
+            f"PSMScheduler(queued={len(self.queue)}, sent={self.sent}, "
+            f"wakeups={self.wakeups}, wakeups_avoided={self.wakeups_avoided})"
+        )
@@ -0,0 +1,388 @@
+import re
+import socket
+import logging
+import binascii
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedSocket:
+    """
+    A UDP socket of the simulated module, backed by a real socket on the host.
+    Received datagrams are queued until they are read with AT+NSORF.
+    """
+
+    def __init__(self, socket_id, port, on_receive):
+        self.socket_id = socket_id
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("0.0.0.0", port or 0))
+        self.sock.settimeout(0.2)
+        self.received = deque()
+        self._on_receive = on_receive
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._receive, name=f"nbiot-sim-socket-{socket_id}", daemon=True
+        )
+        self._thread.start()
+
+    def _receive(self):
+        while not self._closed:
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self.received.append([address, data])
+            self._on_receive(self, len(data))
+
+    def close(self):
+        self._closed = True
+        self.sock.close()
+
+
+class SimulatedN211:
+    """
+    Answers AT commands like a SARA N211 so the tool can run without a module.
+
+    The network is simulated: the module registers attach_delay seconds after
+    AT+COPS, as roaming like the CLI expects by default, and gets 127.0.0.1 as
+    IP address. The signaling connection is released after inactivity_timer
+    seconds without traffic. UDP sockets are real sockets on the host, so
+    datagrams can be sent to and from local servers, like the echo server used
+    by udp-bench.
+
+    Output is given to write_output as bytes, formatted like the module does.
+    """
+
+    MAX_SOCKETS = 7
+    IP = "127.0.0.1"
+    IMEI = "357520070000000"
+    IMSI = "240010000000000"
+    ICCID = "89460100000000000000"
+    # Airtime in ms added to the radio counters per sent and received datagram.
+    TX_TIME_PER_DATAGRAM = 50
+    RX_TIME_PER_DATAGRAM = 20
+
+    def __init__(
+        self,
+        write_output,
+        attach_delay=0.5,
+        boot_delay=0.5,
+        inactivity_timer=20.0,
+        roaming=True,
+        rtt=0.1,
+    ):
+        self.write_output = write_output
+        self.attach_delay = attach_delay
+        self.boot_delay = boot_delay
+        self.inactivity_timer = inactivity_timer
+        self.roaming = roaming
+        self.rtt = rtt
+        self._lock = threading.RLock()
+        self.autoconnect = False
+        self.apn = ""
+        self.pdp_type = "IP"
+        self.sockets = dict()
+        self._attach_generation = 0
+        self._activity_generation = 0
+        self._reset()
+
+    def _reset(self):
+        self.cfun = 1 if self.autoconnect else 0
+        self.cereg_mode = 0
+        self.cscon_mode = 0
+        self.psm = 0
+        self.npsmr = 0
+        self.registration_status = 0
+        self.connected = False
+        self.tx_time = 0
+        self.rx_time = 0
+        # Cancel attach and release timers from before the reset.
+        self._attach_generation += 1
+        self._activity_generation += 1
+        for sim_socket in self.sockets.values():
+            sim_socket.close()
+        self.sockets = dict()
+        if self.autoconnect:
+            self._start_attach()
+
+    # Output
+
+    def _lines(self, *lines):
+        """
+        The module surrounds every line with an empty line.
+        """
+        self.write_output(b"".join(b"\r\n" + line.encode() + b"\r\n" for line in lines))
+
+    def _urc(self, line):
+        logger.debug(f"Simulated URC: {line}")
+        self._lines(line)
+
+    def _later(self, delay, fn, *args):
+        timer = threading.Timer(delay, self._locked, (fn,) + args)
+        timer.daemon = True
+        timer.start()
+
+    def _locked(self, fn, *args):
+        with self._lock:
+            fn(*args)
+
+    # Network
+
+    @property
+    def registered(self):
+        return self.registration_status in (1, 5)
+
+    def _set_registration(self, status):
+        self.registration_status = status
+        if self.cereg_mode:
+            self._urc(f"+CEREG: {status}")
+
+    def _set_connected(self, connected):
+        if connected != self.connected:
+            self.connected = connected
+            if self.cscon_mode:
+                self._urc(f"+CSCON: {int(connected)}")
+
+    def _start_attach(self):
+        self._attach_generation += 1
+        self._later(self.attach_delay, self._attached, self._attach_generation)
+
+    def _attached(self, generation):
+        if generation != self._attach_generation or not self.cfun:
+            return
+        self._set_registration(5 if self.roaming else 1)
+        self._activity()
+
+    def _detach(self):
+        self._attach_generation += 1
+        self._activity_generation += 1
+        self._set_connected(False)
+        if self.registration_status:
+            self._set_registration(0)
+
+    def _activity(self):
+        """
+        Traffic keeps the signaling connection up until inactivity_timer.
+        """
+        self._set_connected(True)
+        self._activity_generation += 1
+        self._later(self.inactivity_timer, self._release, self._activity_generation)
+
+    def _release(self, generation):
+        if generation == self._activity_generation:
+            self._set_connected(False)
+
+    def _socket_received(self, sim_socket, length):
+        with self._lock:
+            self.rx_time += self.RX_TIME_PER_DATAGRAM
+            self._activity()
+            self._urc(f"+NSONMI: {sim_socket.socket_id},{length}")
+
+    # Commands
+
+    def handle(self, line: bytes):
+        """
+        Handle one command line from the host.
+        """
+        command = line.decode(errors="replace").strip()
+        if not command:
+            return
+        with self._lock:
+            if command == "AT+NRB":
+                # The module reboots without answering OK.
+                self._lines("REBOOTING")
+                self._later(self.boot_delay, self._booted)
+                return
+            try:
+                response = self._dispatch(command)
+            except (ValueError, IndexError, OSError) as e:
+                logger.debug(f"Simulated module failed {command}: {e!r}")
+                response = None
+            if response is None:
+                self._lines("ERROR")
+            else:
+                self._lines(*response, "OK")
+
+    def _dispatch(self, command):
+        if command == "AT":
+            return []
+        for pattern, handler in self.COMMANDS:
+            match = re.fullmatch(pattern, command)
+            if match:
+                return handler(self, *match.groups())
+        return None
+
+    def _booted(self):
+        self._reset()
+        self.write_output(b"\r\nu-blox \r\nNeul \r\nOK\r\n")
+
+    def _cfun(self, value):
+        if value is None:
+            return [f"+CFUN: {self.cfun}"]
+        self.cfun = int(value)
+        if not self.cfun:
+            self._detach()
+        return []
+
+    def _cereg(self, value):
+        if value is None:
+            return [f"+CEREG: {self.cereg_mode},{self.registration_status}"]
+        self.cereg_mode = int(value)
+        return []
+
+    def _cscon(self, value):
+        if value is None:
+            return [f"+CSCON: {self.cscon_mode},{int(self.connected)}"]
+        self.cscon_mode = int(value)
+        return []
+
+    def _cpsms(self, value):
+        if value is None:
+            return [f"+CPSMS: {self.psm}"]
+        self.psm = int(value)
+        return []
+
+    def _npsmr(self, value):
+        if value is None:
+            return [f"+NPSMR: {self.npsmr}"]
+        self.npsmr = int(value)
+        return []
+
+    def _cops(self, mode, operator):
+        if mode == "2":
+            self._detach()
+            return []
+        if not self.cfun:
+            return None
+        if not self.registered:
+            self._start_attach()
+        return []
+
+    def _cgdcont(self, value):
+        if value is None:
+            return [f'+CGDCONT: 1,"{self.pdp_type}","{self.apn}",,0,0,,,,,0']
+        cid, pdp_type, apn = [field.strip('"') for field in value.split(",")[:3]]
+        self.pdp_type, self.apn = pdp_type, apn
+        return []
+
+    def _nconfig(self, value):
+        if value is None:
+            autoconnect = "TRUE" if self.autoconnect else "FALSE"
+            return [f'+NCONFIG: "AUTOCONNECT","{autoconnect}"']
+        name, setting = [field.strip('"') for field in value.split(",")]
+        if name == "AUTOCONNECT":
+            self.autoconnect = setting == "TRUE"
+        return []
+
+    def _cgpaddr(self):
+        if not self.registered:
+            return []
+        return [f'+CGPADDR: 0,"{self.IP}"']
+
+    def _cgsn(self):
+        return [f"+CGSN: {self.IMEI}"]
+
+    def _cimi(self):
+        return [self.IMSI]
+
+    def _ccid(self):
+        return [f"+CCID: {self.ICCID}"]
+
+    def _nuestats(self, stats_type):
+        if stats_type == "RADIO":
+            return [
+                'NUESTATS: "RADIO","Signal power",-682',
+                'NUESTATS: "RADIO","Total power",-595',
+                'NUESTATS: "RADIO","TX power",230',
+                f'NUESTATS: "RADIO","TX time",{self.tx_time}',
+                f'NUESTATS: "RADIO","RX time",{self.rx_time}',
+                'NUESTATS: "RADIO","Cell ID",21453156',
+                'NUESTATS: "RADIO","ECL",0',
+                'NUESTATS: "RADIO","SNR",218',
+                'NUESTATS: "RADIO","EARFCN",6352',
+                'NUESTATS: "RADIO","PCI",227',
+                'NUESTATS: "RADIO","RSRQ",-108',
+            ]
+        if stats_type == "CELL":
+            return [
+                'NUESTATS: "CELL",6352,227,1,-1020,-108,-908,36',
+                'NUESTATS: "CELL",6352,301,0,-1242,-197,-1069,-88',
+            ]
+        return None
+
+    def _nsocr(self, port):
+        if len(self.sockets) >= self.MAX_SOCKETS:
+            return None
+        socket_id = min(set(range(self.MAX_SOCKETS)) - set(self.sockets))
+        port = int(port) if port else None
+        self.sockets[socket_id] = SimulatedSocket(
+            socket_id, port, self._socket_received
+        )
+        return [str(socket_id)]
+
+    def _nsost(self, socket_id, host, port, length, hex_data):
+        sim_socket = self.sockets[int(socket_id)]
+        data = binascii.unhexlify(hex_data)
+        if len(data) != int(length) or not self.registered:
+            return None
+        sim_socket.sock.sendto(data, (host, int(port)))
+        self.tx_time += self.TX_TIME_PER_DATAGRAM
+        self._activity()
+        return [f"{socket_id},{length}"]
+
+    def _nsorf(self, socket_id, length):
+        sim_socket = self.sockets[int(socket_id)]
+        if not sim_socket.received:
+            return []
+        message = sim_socket.received[0]
+        (ip, port), data = message
+        part, rest = data[: int(length)], data[int(length) :]
+        if rest:
+            message[1] = rest
+        else:
+            sim_socket.received.popleft()
+        hex_data = binascii.hexlify(part).upper().decode()
+        return [f'{socket_id},"{ip}",{port},{len(part)},"{hex_data}",{len(rest)}']
+
+    def _nsocl(self, socket_id):
+        self.sockets.pop(int(socket_id)).close()
+        return []
+
+    def _nping(self, ip):
+        if not self.registered:
+            return None
+        self._later(self.rtt, self._urc, f'+NPING: "{ip}",64,{int(self.rtt * 1000)}')
+        return []
+
+    COMMANDS = [
+        (r"AT\+CFUN(?:=(\d)|\?)", _cfun),
+        (r"AT\+CEREG(?:=(\d)|\?)", _cereg),
+        (r"AT\+CSCON(?:=(\d)|\?)", _cscon),
+        (r"AT\+CPSMS(?:=(\d)|\?)", _cpsms),
+        (r"AT\+NPSMR(?:=(\d)|\?)", _npsmr),
+        (r'AT\+COPS=(\d)(?:,2,"(\d+)")?', _cops),
+        (r"AT\+CGDCONT(?:=(.+)|\?)", _cgdcont),
+        (r"AT\+NCONFIG(?:=(.+)|\?)", _nconfig),
+        (r"AT\+CGPADDR", _cgpaddr),
+        (r"AT\+CGSN=1", _cgsn),
+        (r"AT\+CIMI", _cimi),
+        (r"AT\+CCID", _ccid),
+        (r'AT\+NUESTATS="(\w+)"', _nuestats),
+        (r'AT\+NSOCR="DGRAM",17(?:,(\d+))?', _nsocr),
+        (r'AT\+NSOST=(\d),"([^"]+)",(\d+),(\d+),"([0-9A-Fa-f]*)"', _nsost),
+        (r"AT\+NSORF=(\d),(\d+)", _nsorf),
+        (r"AT\+NSOCL=(\d)", _nsocl),
+        (r'AT\+NPING="([^"]+)"', _nping),
+    ]
+
+    def close(self):
+        with self._lock:
+            self._attach_generation += 1
+            self._activity_generation += 1
+            for sim_socket in self.sockets.values():
+                sim_socket.close()
+            self.sockets = dict()
@@ -1,4 +1,8 @@
 import binascii
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
 
 
 class UbloxSocket:
@@ -11,6 +15,7 @@ class UbloxSocket:
         # But when receiving on the same socket that you sent on you need to
         # send at least once on the socket before you can receive.
         self.able_to_receive = False
+        self.closed = False
 
     def sendto(self, bytes, address):
         pass
@@ -23,6 +28,7 @@ class UbloxSocket:
 
     def close(self):
         self.module.close_socket(self.socket_id)
+        self.closed = True
 
 
 class UDPSocket(UbloxSocket):
@@ -61,3 +67,68 @@ class UDPSocket(UbloxSocket):
             return data, address
         else:
             return None
+
+
+class SocketPool:
+    """
+    Reuses open sockets on the module keyed by local port, so short lived
+    senders don't have to create and close a socket for every message.
+
+    When the module has no free sockets the least recently used socket in the
+    pool is closed. Sockets lost when the module reboots are recreated when
+    they are used the next time.
+    """
+
+    def __init__(self, module, max_sockets=None):
+        self.module = module
+        self.max_sockets = max_sockets or module.MAX_SOCKETS
+        self.sockets = OrderedDict()
+
+    def get(self, port=None):
+        """
+        Get an open socket bound to port. None gives a socket on any port.
+        """
+        return self.module.run_transaction(self._get, port)
+
+    def _get(self, port):
+        sock = self.sockets.get(port)
+        if sock is not None and sock.closed:
+            del self.sockets[port]
+            sock = None
+
+        if sock is None:
+            self._make_room()
+            sock = self.module.create_socket(port)
+            self.sockets[port] = sock
+        else:
+            if self.module.sockets.get(sock.socket_id) is not sock:
+                self.module.reopen_socket(sock)
+            self.sockets.move_to_end(port)
+        return sock
+
+    def _make_room(self):
+        while len(self.module.sockets) >= self.max_sockets:
+            if not self.sockets:
+                raise IOError("No free sockets on the module")
+            port, sock = self.sockets.popitem(last=False)
+            logger.info(f"Evicting socket {sock.socket_id} on port {port}")
+            if self.module.sockets.get(sock.socket_id) is sock:
+                sock.close()
+
+    def sendto(self, data, address, port=None):
+        """
+        Send data to address from a pooled socket on port.
+        """
+        self.get(port).sendto(data, address)
+
+    def close(self):
+        """
+        Close all sockets in the pool.
+        """
+        while self.sockets:
+            port, sock = self.sockets.popitem()
+            if self.module.sockets.get(sock.socket_id) is sock:
+                sock.close()
+
+    def __len__(self):
+        return len(self.sockets)
@@ -0,0 +1,141 @@
+from collections import namedtuple
+
+STATE_FIELDS = (
+    "registration_status",
+    "connected",
+    "psm_active",
+    "ip",
+    "imei",
+    "imsi",
+    "iccid",
+    "apn",
+    "sockets",
+    "radio_signal_power",
+    "radio_total_power",
+    "radio_tx_power",
+    "radio_tx_time",
+    "radio_rx_time",
+    "radio_cell_id",
+    "radio_ecl",
+    "radio_snr",
+    "radio_earfcn",
+    "radio_pci",
+    "radio_rsrq",
+    "radio_rsrp",
+)
+
+_SOCKETS_INDEX = STATE_FIELDS.index("sockets")
+
+StateChange = namedtuple("StateChange", "name old new")
+
+
+class StateSnapshot(namedtuple("StateSnapshot", STATE_FIELDS)):
+    """
+    Immutable copy of the module state at one point in time. Sockets are stored
+    as a sorted tuple of socket ids so the snapshot is hashable and small.
+    """
+
+    __slots__ = ()
+
+    def diff(self, other):
+        """
+        Return the StateChanges needed to go from this snapshot to other.
+        """
+        return [
+            StateChange(name, old, new)
+            for name, old, new in zip(self._fields, self, other)
+            if old != new
+        ]
+
+
+class ModuleState:
+    """
+    Holds all state of a module. Uses slots to keep the object small and makes
+    it cheap to take snapshots and compare them.
+    """
+
+    __slots__ = STATE_FIELDS
+
+    def __init__(self):
+        self.registration_status = 0
+        self.connected = False
+        self.psm_active = False
+        self.ip = None
+        self.imei = None
+        self.imsi = None
+        self.iccid = None
+        self.apn = None
+        self.sockets = {}
+        self.radio_signal_power = None
+        self.radio_total_power = None
+        self.radio_tx_power = None
+        self.radio_tx_time = None
+        self.radio_rx_time = None
+        self.radio_cell_id = None
+        self.radio_ecl = None
+        self.radio_snr = None
+        self.radio_earfcn = None
+        self.radio_pci = None
+        self.radio_rsrq = None
+        self.radio_rsrp = None
+
+    def snapshot(self):
+        """
+        Return an immutable StateSnapshot of the current state.
+        """
+        values = [getattr(self, name) for name in STATE_FIELDS]
+        values[_SOCKETS_INDEX] = tuple(sorted(self.sockets))
+        return StateSnapshot(*values)
+
+    def changes_since(self, snapshot):
+        """
+        Return the StateChanges between a previous snapshot and now.
+        """
+        return snapshot.diff(self.snapshot())
+
+    def __repr__(self):
+        return f"ModuleState({self.snapshot()!r})"
+
+
+class StateAttribute:
+    """
+    Descriptor exposing an attribute of the ModuleState on the owning object so
+    module.ip and module.state.ip is the same value.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return getattr(instance.state, self.name)
+
+    def __set__(self, instance, value):
+        setattr(instance.state, self.name, value)
+
+
+class StateWatcher:
+    """
+    Keeps the last seen snapshot of a module state so that monitoring code only
+    has to handle what changed since the last poll.
+    """
+
+    def __init__(self, state: ModuleState):
+        self.state = state
+        self.last = state.snapshot()
+
+    def poll(self):
+        """
+        Return the StateChanges since the last poll.
+        """
+        current = self.state.snapshot()
+        changes = self.last.diff(current)
+        self.last = current
+        return changes
+
+    def __iter__(self):
+        """
+        Iterate over the changes since the last poll.
+        """
+        return iter(self.poll())
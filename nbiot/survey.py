@@ -0,0 +1,103 @@
+import logging
+from collections import namedtuple
+
+from .module import ATError, ATTimeoutError, RegistrationDeniedError
+from .state import STATE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+SurveyResult = namedtuple(
+    "SurveyResult",
+    "operator status time_to_register time_to_ip timeout snapshot error",
+)
+
+RADIO_FIELDS = tuple(name for name in STATE_FIELDS if name.startswith("radio_"))
+
+
+class AttachBound:
+    """
+    Learns how long a successful attach takes so that attempts that make no
+    progress can be aborted early. The bound is factor times the slowest
+    successful attach seen, but never less than minimum or more than default.
+    """
+
+    def __init__(self, default=180, minimum=30, factor=2.0):
+        self.default = default
+        self.minimum = minimum
+        self.factor = factor
+        self.slowest = None
+
+    def observe(self, time_to_register):
+        if self.slowest is None or time_to_register > self.slowest:
+            self.slowest = time_to_register
+
+    @property
+    def value(self):
+        if self.slowest is None:
+            return self.default
+        return min(self.default, max(self.minimum, self.factor * self.slowest))
+
+
+class OperatorSurvey:
+    """
+    Tries to attach to each operator in turn and records time to attach and
+    radio statistics. Attempts are aborted when the network denies the
+    registration or when there is no registration within the learned bound.
+    Failed attempts are reported without radio statistics.
+
+    The module should be configured with URCs enabled before running.
+    """
+
+    def __init__(self, module, operators, bound=None):
+        self.module = module
+        self.operators = operators
+        self.bound = bound or AttachBound()
+
+    def run(self):
+        """
+        Yields a SurveyResult for each operator as soon as it is done.
+        """
+        for operator in self.operators:
+            yield self.survey(operator)
+
+    def survey(self, operator):
+        module = self.module
+        timeout = self.bound.value
+        logger.info(f"Surveying operator {operator} with timeout {timeout:.0f} s")
+        # Don't report the attach times of the previous operator if we fail
+        # before connect starts a new timeline.
+        module.timeline = None
+        try:
+            if module.registered:
+                module.deregister()
+            # COPS and the wait for registration share the bound.
+            module.connect(operator, timeout=timeout)
+            module.update_radio_statistics()
+        except RegistrationDeniedError as e:
+            return self._result(operator, "denied", timeout, e)
+        except ATTimeoutError as e:
+            # Also when COPS itself takes longer than the bound.
+            return self._result(operator, "timeout", timeout, e)
+        except ATError as e:
+            return self._result(operator, "error", timeout, e)
+
+        if module.timeline.time_to_register is not None:
+            self.bound.observe(module.timeline.time_to_register)
+        return self._result(operator, "attached", timeout)
+
+    def _result(self, operator, status, timeout, error=None):
+        timeline = self.module.timeline
+        snapshot = self.module.snapshot()
+        if error is not None:
+            # The radio statistics are only read after a successful attach,
+            # so they belong to an earlier operator.
+            snapshot = snapshot._replace(**{name: None for name in RADIO_FIELDS})
+        return SurveyResult(
+            operator,
+            status,
+            timeline.time_to_register if timeline else None,
+            timeline.time_to_ip if timeline else None,
+            timeout,
+            snapshot,
+            repr(error) if error else None,
+        )
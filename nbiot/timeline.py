@@ -0,0 +1,77 @@
+import time
+from collections import namedtuple
+
+TimelineEvent = namedtuple("TimelineEvent", "timestamp elapsed name value")
+
+
+class AttachTimeline:
+    """
+    Records timestamped registration and connection state transitions while
+    the module is attaching to a network.
+
+    Events are named after the AT command that reported them, ex. CEREG with
+    the registration status or CSCON with the signaling connection status.
+    """
+
+    REGISTERED_STATUSES = (1, 5)
+    SEARCHING_STATUS = 2
+
+    def __init__(self, operator=None):
+        self.operator = operator
+        self.started = time.time()
+        self.events = list()
+        self.finished = None
+
+    def finish(self):
+        """
+        Stop the timeline. Later state transitions are not part of the attach.
+        """
+        self.finished = time.time()
+
+    @property
+    def duration(self):
+        end = self.finished or time.time()
+        return end - self.started
+
+    def mark(self, name, value=None):
+        now = time.time()
+        event = TimelineEvent(now, now - self.started, name, value)
+        self.events.append(event)
+        return event
+
+    def first(self, name, *values):
+        """
+        Returns the first event with name, and one of values if given.
+        """
+        for event in self.events:
+            if event.name == name and (not values or event.value in values):
+                return event
+        return None
+
+    def time_to(self, name, *values):
+        """
+        Seconds from start until the first matching event or None
+        """
+        event = self.first(name, *values)
+        return event.elapsed if event else None
+
+    @property
+    def time_to_search(self):
+        return self.time_to("CEREG", self.SEARCHING_STATUS)
+
+    @property
+    def time_to_register(self):
+        return self.time_to("CEREG", *self.REGISTERED_STATUSES)
+
+    @property
+    def time_to_connected(self):
+        return self.time_to("CSCON", True)
+
+    @property
+    def time_to_ip(self):
+        return self.time_to("IP")
+
+    def __repr__(self):
+        return (
+            f"AttachTimeline(operator={self.operator}, " f"events={len(self.events)})"
+        )
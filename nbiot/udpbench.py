@@ -0,0 +1,142 @@
+import time
+import struct
+import logging
+import socketserver
+
+from .utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Every datagram starts with a sequence number and the time it was sent.
+HEADER = struct.Struct("!Id")
+
+# Max payload the N211 can send in one datagram.
+MAX_SIZE = 512
+
+
+class BenchmarkResult:
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.received_bytes = 0
+        self.rtts = list()
+        self.started = None
+        self.finished = None
+
+    @property
+    def duration(self):
+        return self.finished - self.started
+
+    @property
+    def lost(self):
+        return self.sent - self.received
+
+    @property
+    def loss(self):
+        """
+        Lost datagrams in percent
+        """
+        return 100 * self.lost / self.sent if self.sent else 0.0
+
+    @property
+    def goodput(self):
+        """
+        Echoed payload in bytes per second
+        """
+        return self.received_bytes / self.duration if self.duration else 0.0
+
+    def rtt_percentile(self, pct):
+        return percentile(self.rtts, pct)
+
+    def __repr__(self):
+        return (
+            f"BenchmarkResult(sent={self.sent}, received={self.received}, "
+            f"duplicates={self.duplicates}, reordered={self.reordered})"
+        )
+
+
+class UDPBenchmark:
+    """
+    Sends sequenced and timestamped datagrams at a fixed rate over a socket to
+    an echo endpoint and matches the echoes that come back.
+    """
+
+    def __init__(self, sock, address, size=64, rate=1.0, count=10, wait=10.0):
+        if not HEADER.size <= size <= MAX_SIZE:
+            raise ValueError(f"Size must be between {HEADER.size} and {MAX_SIZE}")
+        self.sock = sock
+        self.address = address
+        self.size = size
+        self.rate = rate
+        self.count = count
+        self.wait = wait
+        self.result = BenchmarkResult()
+        self._seen = set()
+        self._highest_seen = -1
+
+    def _datagram(self, sequence):
+        header = HEADER.pack(sequence, time.time())
+        return header + bytes(self.size - HEADER.size)
+
+    def _handle_echo(self, data):
+        now = time.time()
+        if len(data) < HEADER.size:
+            logger.warning(f"Received short datagram: {data!r}")
+            return
+        sequence, sent_at = HEADER.unpack_from(data)
+        if sequence in self._seen:
+            self.result.duplicates += 1
+            return
+        self._seen.add(sequence)
+        if sequence < self._highest_seen:
+            self.result.reordered += 1
+        self._highest_seen = max(self._highest_seen, sequence)
+        self.result.received += 1
+        self.result.received_bytes += len(data)
+        self.result.rtts.append((now - sent_at) * 1000)
+
+    def run(self):
+        interval = 1 / self.rate
+        result = self.result
+        result.started = time.time()
+        next_send = result.started
+        last_send = result.started
+        while True:
+            now = time.time()
+            if result.sent < self.count and now >= next_send:
+                self.sock.sendto(self._datagram(result.sent), self.address)
+                result.sent += 1
+                last_send = now
+                next_send += interval
+                continue
+
+            if result.sent >= self.count:
+                if result.received >= self.count or now - last_send > self.wait:
+                    break
+
+            received = self.sock.recvfrom(self.size)
+            if received:
+                self._handle_echo(received[0])
+            elif result.sent < self.count:
+                time.sleep(max(0.0, min(0.05, next_send - time.time())))
+            else:
+                time.sleep(0.05)
+
+        result.finished = time.time()
+        return result
+
+
+class EchoHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        logger.debug(f"Echoing {len(data)} bytes to {self.client_address}")
+        sock.sendto(data, self.client_address)
+
+
+def echo_server(host="0.0.0.0", port=9000):
+    """
+    A local UDP echo server to run the benchmark against.
+    """
+    return socketserver.UDPServer((host, port), EchoHandler)
@@ -0,0 +1,32 @@
+import math
+import statistics
+
+
+def percentile(values, pct):
+    """
+    Percentile using linear interpolation between the closest ranks.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values):
+    """
+    Returns the distribution of values as (min, median, p90, max). All are None
+    if there are no values.
+    """
+    if not values:
+        return None, None, None, None
+    return (
+        min(values),
+        statistics.median(values),
+        percentile(values, 90),
+        max(values),
+    )
@@ -20,6 +20,7 @@ REQUIRED = [
 # What packages are optional?
 EXTRAS = {
     # 'fancy feature': ['django'],
+    'test': ['pytest', 'pytest-benchmark'],
 }
 
 here = os.path.abspath(os.path.dirname(__file__))
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import pytest
+
+RESPONSES = Path(__file__).parent / "responses"
+
+
+def load_lines(name):
+    """
+    Lines recorded from a SARA N211, as bytes without line endings.
+    """
+    return (RESPONSES / name).read_bytes().splitlines()
+
+
+@pytest.fixture
+def radio_lines():
+    return load_lines("nuestats_radio.txt")
+
+
+@pytest.fixture
+def cell_lines():
+    return load_lines("nuestats_cell.txt")
+
+
+@pytest.fixture
+def nsorf_lines():
+    return load_lines("nsorf.txt")
+
+
+@pytest.fixture
+def urc_lines():
+    return load_lines("urc.txt")
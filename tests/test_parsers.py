@@ -0,0 +1,89 @@
+"""
+Correctness checks and benchmarks of the response parsers over recorded
+module responses. Run with pytest, benchmarks need pytest-benchmark.
+"""
+
+from nbiot import parsers
+from nbiot.module import SaraN211Module
+
+
+def parse_all(parser, lines):
+    return [parser(line) for line in lines]
+
+
+def test_parse_nuestats(radio_lines):
+    assert parsers.parse_nuestats(radio_lines[0]) == (
+        b"RADIO",
+        b"Signal power",
+        -682,
+    )
+    assert parsers.parse_nuestats(b"+CSCON: 1") is None
+
+
+def test_parse_cell_stats(cell_lines):
+    cell = parsers.parse_cell_stats(cell_lines[0])
+    assert cell == parsers.CellStats(3569, 69, True, -102.0, -10.8, -90.8, 3.6)
+    assert parsers.parse_cell_stats(b'NUESTATS: "RADIO","ECL",0') is None
+
+
+def test_parse_udp_message(nsorf_lines):
+    assert parsers.parse_udp_message(nsorf_lines[0]) == (
+        0,
+        b"192.168.5.1",
+        1024,
+        2,
+        b"ABAB",
+        0,
+    )
+
+
+def test_urc_id(urc_lines):
+    assert [parsers.urc_id(line) for line in urc_lines[:3]] == [
+        b"CEREG",
+        b"CEREG",
+        b"CSCON",
+    ]
+    assert parsers.urc_id(b"+NPINGERR") == b"NPINGERR"
+
+
+def test_fields():
+    assert parsers.fields(b'+CGPADDR: 0,"10.188.213.41"') == [
+        b"0",
+        b"10.188.213.41",
+    ]
+
+
+def test_parse_radio_stats_on_module(radio_lines):
+    module = SaraN211Module(None)
+    module._parse_radio_stats(radio_lines)
+    assert module.radio_signal_power == -68.2
+    assert module.radio_ecl == 0
+    assert module.radio_rsrq == -108
+
+
+def test_benchmark_parse_nuestats(benchmark, radio_lines):
+    result = benchmark(parse_all, parsers.parse_nuestats, radio_lines)
+    assert len(result) == len(radio_lines)
+
+
+def test_benchmark_parse_cell_stats(benchmark, cell_lines):
+    result = benchmark(parse_all, parsers.parse_cell_stats, cell_lines)
+    assert None not in result
+
+
+def test_benchmark_parse_udp_message(benchmark, nsorf_lines):
+    result = benchmark(parse_all, parsers.parse_udp_message, nsorf_lines)
+    assert len(result) == len(nsorf_lines)
+
+
+def test_benchmark_urc_fields(benchmark, urc_lines):
+    result = benchmark(
+        parse_all, lambda line: (parsers.urc_id(line), parsers.fields(line)), urc_lines
+    )
+    assert len(result) == len(urc_lines)
+
+
+def test_benchmark_parse_radio_stats_on_module(benchmark, radio_lines):
+    module = SaraN211Module(None)
+    benchmark(module._parse_radio_stats, radio_lines)
+    assert module.radio_cell_id == 21453156
@@ -0,0 +1,68 @@
+"""
+End to end checks against the simulated module, see nbiot.simulator.
+"""
+
+import threading
+
+import pytest
+
+from nbiot.module import SaraN211Module
+from nbiot.survey import AttachBound, OperatorSurvey
+from nbiot.udpbench import UDPBenchmark, echo_server
+
+
+@pytest.fixture
+def attach_delay():
+    return 0.1
+
+
+@pytest.fixture
+def module(attach_delay):
+    module = SaraN211Module(
+        f"sim://?attach_delay={attach_delay}&boot_delay=0.1", roaming=True
+    )
+    module.enable_signaling_connection_urc()
+    module.enable_network_registration()
+    module.enable_radio_functions()
+    yield module
+    module.close()
+
+
+@pytest.fixture
+def echo_address():
+    server = echo_server("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_connect(module):
+    module.connect(None)
+    assert module.registered
+    assert module.ip == "127.0.0.1"
+    assert module.timeline.time_to_register is not None
+
+
+def test_reboot(module):
+    boot_time = module.reboot()
+    assert boot_time < module.REBOOT_TIMEOUT
+    assert not module.registered
+
+
+def test_udp_bench(module, echo_address):
+    module.connect(None)
+    sock = module.create_socket(None)
+    result = UDPBenchmark(sock, echo_address, rate=50, count=10, wait=2).run()
+    sock.close()
+    assert result.received == result.sent == 10
+    assert module.available_messages == []
+
+
+@pytest.mark.parametrize("attach_delay", [1.0])
+def test_survey_timeout(module):
+    bound = AttachBound(default=0.3, minimum=0)
+    (result,) = OperatorSurvey(module, [24001], bound).run()
+    assert result.status == "timeout"
+    assert result.snapshot.radio_rsrq is None